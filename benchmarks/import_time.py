@@ -0,0 +1,54 @@
+"""
+	Cold start of `import hazm` and a first normalization, in fresh interpreters.
+	Exits with 1 when the median is over budget or a heavy backend is loaded on the way.
+
+	$ python benchmarks/import_time.py --budget 150
+"""
+
+from __future__ import print_function
+import argparse, json, os, subprocess, sys
+
+heavy = ['nltk', 'numpy', 'lxml', 'sklearn', 'clr', 'asyncio']
+
+script = '''
+import time, sys
+start = time.perf_counter()
+import hazm
+imported = time.perf_counter()
+hazm.Normalizer().cleanup('اصلاح نويسه ها و فاصله ها')
+done = time.perf_counter()
+print('%%f %%f %%s' %% (imported - start, done - start, ','.join(name for name in %r if name in sys.modules) or '-'))
+''' % heavy
+
+def measure(runs):
+	root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	env = dict(os.environ, PYTHONPATH=root + os.pathsep + os.environ.get('PYTHONPATH', ''))
+	results = []
+	for i in range(runs):
+		output = subprocess.check_output([sys.executable, '-c', script], env=env, universal_newlines=True).split()
+		results.append((float(output[0]), float(output[1]), output[2]))
+	return results
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='import time benchmark of hazm')
+	parser.add_argument('--runs', type=int, default=10)
+	parser.add_argument('--budget', type=float, default=150, help='milliseconds for import hazm plus the first cleanup')
+	parser.add_argument('--json', help='write results to this file')
+	args = parser.parse_args()
+
+	results = measure(args.runs)
+	median = lambda values: sorted(values)[len(values) // 2] * 1000
+	report = {
+		'import_ms': median([imported for imported, done, loaded in results]),
+		'import_and_cleanup_ms': median([done for imported, done, loaded in results]),
+		'heavy_modules': sorted(set(name for imported, done, loaded in results for name in loaded.split(',') if name != '-')),
+		'budget_ms': args.budget,
+	}
+	print('import hazm:            %.1f ms' % report['import_ms'])
+	print('import and cleanup:     %.1f ms (budget %.0f ms)' % (report['import_and_cleanup_ms'], args.budget))
+	print('heavy modules loaded:   %s' % (', '.join(report['heavy_modules']) or 'none'))
+	if args.json:
+		with open(args.json, 'w') as output:
+			json.dump(report, output, indent=2)
+
+	sys.exit(1 if report['heavy_modules'] or report['import_and_cleanup_ms'] > args.budget else 0)
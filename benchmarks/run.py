@@ -0,0 +1,276 @@
+"""
+	Benchmarks of hazm components. Each case runs in a fresh interpreter, so its peak RSS is
+	its own, and reports throughput (chars, tokens and sentences per second), p50/p99 latency
+	of one unit of work (a document, sentence or batch) and peak RSS.
+
+	Inputs are benchmarks/sample.txt and synthetic documents made of its shuffled sentences;
+	corpus cases run when their corpus is given.
+
+	$ python benchmarks/run.py --output results.json
+	$ python benchmarks/run.py --only 'tokenizer|stemmer' --bijankhan data/ --hamshahri data/hamshahri/
+	$ python benchmarks/run.py --compare base.json results.json --threshold 0.1
+
+	Cases of optimized paths first check their output against the plain path and fail on any
+	difference, --check runs only these checks and exits with 1 on a difference.
+
+	$ python benchmarks/run.py --check
+"""
+
+from __future__ import print_function
+import argparse, inspect, itertools, json, os, platform, random, re, resource, subprocess, sys, time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+def sample_docs(size, seed=0):
+	"""
+		Returns lines of sample.txt and synthetic documents of its sentences in random order, up to size characters
+	"""
+	lines = [line for line in open(os.path.join(root, 'benchmarks', 'sample.txt'), encoding='utf-8').read().split('\n') if line]
+	sentences = [sent for line in lines for sent in re.split(r'(?<=[\.\!\?؟])\s+', line) if sent]
+	generator = random.Random(seed)
+	docs, total = list(lines), sum(len(line) for line in lines)
+	while total < size:
+		doc = ' '.join(generator.choice(sentences) for i in range(generator.randint(3, 12)))
+		docs.append(doc)
+		total += len(doc)
+	return docs
+
+def affix_docs(count=5000, seed=0):
+	"""
+		Returns texts of affixes and words of fix_suffix and fix_prefix rules joined by spaces, newlines,
+		tabs and zwnj, the edge cases of the single pass rewriter
+	"""
+	from hazm.PersianTextNormalizer import PersianTextNormalizer
+	normalizer = PersianTextNormalizer()
+	patterns = [pattern.pattern for pattern, rep in normalizer._fix_suffix_pattern] + [pattern.pattern for pattern in normalizer._fix_prefix_pattern]
+	words = sorted(set(word for pattern in patterns for word in re.findall(r'[\u0600-\u06FF]+', pattern)) | set(['کتاب', 'راه', 'آهن', 'ی', 'ها', 'های', 'ان', 'م', '\u200c', '.', '!', '؟']))
+	separators = [' ', '  ', '\n', ' \n ', '\t', '\u200c', ' \u200c ']
+	generator = random.Random(seed)
+	docs = []
+	for i in range(count):
+		doc = ''.join(generator.choice(words) + generator.choice(separators) for j in range(generator.randint(1, 12)))
+		docs.append(generator.choice(separators) + doc if generator.random() < 0.5 else doc)
+	return docs
+
+# checks return the number of documents whose output differs from the plain path
+
+def check_single_pass(docs):
+	from hazm.PersianTextNormalizer import PersianTextNormalizer
+	plain, single_pass = PersianTextNormalizer(), PersianTextNormalizer(single_pass_affixes=True)
+	docs = docs + affix_docs()
+	return sum(1 for doc in docs if single_pass.cleanup(doc) != plain.cleanup(doc) or single_pass.fix_prefix(single_pass.fix_suffix(doc)) != plain.fix_prefix(plain.fix_suffix(doc)))
+
+def check_pipeline(docs):
+	from hazm.Pipeline import Pipeline
+	from hazm.PersianTextNormalizer import PersianTextNormalizer
+	from hazm.PersianTokenizer import PersianTokenizer
+	pipeline, normalizer, tokenizer = Pipeline(), PersianTextNormalizer(), PersianTokenizer()
+	# output must be the cleanup, sent_tokenize, word_tokenize chain's
+	chain = lambda doc: [sent for sent in ([word for word in tokenizer.word_tokenize(sent) if word] for sent in tokenizer.sent_tokenize(normalizer.cleanup(doc))) if sent]
+	return sum(1 for doc in docs if pipeline.tokenize(doc) != chain(doc))
+
+def checked(check, docs):
+	differ = check(docs)
+	if differ:
+		raise Exception('%s: output differs from the plain path in %d documents' % (check.__name__, differ))
+
+# cases set up their component and return an iterator that does one unit of work per step
+# and yields its (chars, tokens, sentences)
+
+def normalizer_cleanup(args, docs, **flags):
+	from hazm.PersianTextNormalizer import PersianTextNormalizer
+	if flags.get('single_pass_affixes'):
+		checked(check_single_pass, docs)
+	normalizer = PersianTextNormalizer(**flags)
+	return ((len(doc), len(normalizer.cleanup(doc).split()), 0) for doc in docs)
+
+def normalizer_cleanup_batch(args, docs):
+	from hazm.PersianTextNormalizer import PersianTextNormalizer
+	normalizer = PersianTextNormalizer()
+	batches = [docs[i:i+100] for i in range(0, len(docs), 100)]
+	return ((sum(len(doc) for doc in batch), sum(len(text.split()) for text in normalizer.cleanup_batch(batch)), 0) for batch in batches)
+
+def pipeline_tokenize(args, docs):
+	from hazm.Pipeline import Pipeline
+	checked(check_pipeline, docs)
+	pipeline = Pipeline()
+	return ((len(doc),) + (lambda sents: (sum(len(sent) for sent in sents), len(sents)))(pipeline.tokenize(doc)) for doc in docs)
+
+def tokenizer_sent_tokenize(args, docs):
+	from hazm.PersianTokenizer import PersianTokenizer
+	tokenizer = PersianTokenizer()
+	return ((len(doc), 0, len(tokenizer.sent_tokenize(doc))) for doc in docs)
+
+def _sentences(docs):
+	from hazm.PersianTokenizer import PersianTokenizer
+	return [sent for doc in docs for sent in PersianTokenizer().sent_tokenize(doc) if sent]
+
+def tokenizer_word_tokenize(args, docs):
+	from hazm.PersianTokenizer import PersianTokenizer
+	tokenizer, sents = PersianTokenizer(), _sentences(docs)
+	return ((len(sent), len(tokenizer.word_tokenize(sent)), 1) for sent in sents)
+
+def tokenizer_span_tokenize(args, docs):
+	from hazm.PersianTokenizer import PersianTokenizer
+	tokenizer, sents = PersianTokenizer(), _sentences(docs)
+	return ((len(sent), sum(1 for span in tokenizer.span_tokenize(sent)), 1) for sent in sents)
+
+def _token_batches(docs, size=256):
+	tokens = [token for doc in docs for token in doc.split()]
+	return [tokens[i:i+size] for i in range(0, len(tokens), size)]
+
+def stemmer_perstem(args, docs):
+	from hazm.PerStemmer import PerStemmer
+	stemmer, batches = PerStemmer(pool_size=args.workers), _token_batches(docs)
+	stemmer.stem_many(batches[0])
+	return ((sum(len(token) for token in batch), len(stemmer.stem_many(batch)), 0) for batch in batches)
+
+def stemmer_suffix(args, docs):
+	from hazm.SuffixStemmer import SuffixStemmer
+	stemmer, batches = SuffixStemmer(cache_size=0), _token_batches(docs)
+	return ((sum(len(token) for token in batch), len(stemmer.stem_many(batch)), 0) for batch in batches)
+
+def lemmatizer_native(args, docs):
+	from hazm.NativeLemmatizer import NativeLemmatizer
+	lemmatizer, batches = NativeLemmatizer(lexicon=None), _token_batches(docs)
+	return ((sum(len(token) for token in batch), len([lemmatizer.lemma(token) for token in batch]), 0) for batch in batches)
+
+def bijankhan_sents(args, docs):
+	from hazm import BijankhanReader
+	if not args.bijankhan:
+		raise Exception('needs --bijankhan')
+	BijankhanReader.bijankhan_root = os.path.join(args.bijankhan, '')
+	return ((len(sent), sent.count(' ') + 1, 1) for sent in itertools.islice(BijankhanReader.sents(), args.limit))
+
+def hamshahri_docs(args, docs):
+	from hazm.HamshahriReader import HamshahriReader
+	if not args.hamshahri:
+		raise Exception('needs --hamshahri')
+	return ((len(doc.text), 0, 0) for doc in itertools.islice(HamshahriReader(args.hamshahri).docs(), args.limit))
+
+def cases():
+	"""
+		Returns name: (function, keyword arguments) of all cases, cleanup is run once more with each flag toggled
+	"""
+	from hazm.PersianTextNormalizer import PersianTextNormalizer
+	result = {'normalizer.cleanup': (normalizer_cleanup, {})}
+	for name, parameter in inspect.signature(PersianTextNormalizer.__init__).parameters.items():
+		if isinstance(parameter.default, bool):
+			result['normalizer.cleanup[%s=%s]' % (name, not parameter.default)] = (normalizer_cleanup, {name: not parameter.default})
+	for function in (normalizer_cleanup_batch, pipeline_tokenize, tokenizer_sent_tokenize, tokenizer_word_tokenize, tokenizer_span_tokenize, stemmer_perstem, stemmer_suffix, lemmatizer_native, bijankhan_sents, hamshahri_docs):
+		result[function.__name__.replace('_', '.', 1)] = (function, {})
+	return result
+
+def percentile(values, p):
+	values = sorted(values)
+	return values[min(len(values) - 1, int(p / 100.0 * len(values)))] if values else 0.0
+
+def measure(args, name):
+	function, kwargs = cases()[name]
+	iterator = function(args, sample_docs(args.size, args.seed), **kwargs)
+
+	chars = tokens = sents = 0
+	latencies = []
+	start = last = time.perf_counter()
+	for c, t, s in iterator:
+		now = time.perf_counter()
+		latencies.append(now - last)
+		last = now
+		chars, tokens, sents = chars + c, tokens + t, sents + s
+	seconds = max(last - start, 1e-9)
+
+	return {
+		'units': len(latencies),
+		'seconds': seconds,
+		'chars_per_sec': chars / seconds,
+		'tokens_per_sec': tokens / seconds if tokens else None,
+		'sents_per_sec': sents / seconds if sents else None,
+		'p50_ms': percentile(latencies, 50) * 1000,
+		'p99_ms': percentile(latencies, 99) * 1000,
+		'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+	}
+
+def run(args):
+	names = [name for name in cases() if not args.only or re.search(args.only, name)]
+	options = ['--size', str(args.size), '--seed', str(args.seed), '--workers', str(args.workers), '--limit', str(args.limit)]
+	for option in ('bijankhan', 'hamshahri'):
+		if getattr(args, option):
+			options += ['--' + option, getattr(args, option)]
+
+	try:
+		commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=root, universal_newlines=True).strip()
+	except (OSError, subprocess.CalledProcessError):
+		commit = None
+	report = {'meta': {'commit': commit, 'python': platform.python_version(), 'platform': platform.platform(), 'size': args.size, 'seed': args.seed}, 'results': {}}
+
+	for name in names:
+		child = subprocess.run([sys.executable, os.path.abspath(__file__), '--case', name] + options, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+		if child.returncode != 0:
+			reason = (child.stderr.strip().split('\n') or [''])[-1]
+			report['results'][name] = {'skipped': reason}
+			print('%-50s skipped: %s' % (name, reason))
+			continue
+		result = json.loads(child.stdout.strip().split('\n')[-1])
+		report['results'][name] = result
+		print('%-50s %10.0f chars/s %10s tokens/s  p50 %7.3f ms  p99 %7.3f ms  rss %6.1f MB' % (name, result['chars_per_sec'], '%.0f' % result['tokens_per_sec'] if result['tokens_per_sec'] else '-', result['p50_ms'], result['p99_ms'], result['peak_rss_mb']))
+
+	if args.output:
+		with open(args.output, 'w') as output:
+			json.dump(report, output, indent=2, sort_keys=True)
+	return 0
+
+def check(args):
+	docs = sample_docs(args.size, args.seed)
+	failures = 0
+	for function in (check_single_pass, check_pipeline):
+		differ = function(docs)
+		failures += bool(differ)
+		print('%-50s %s' % (function.__name__, '%d documents differ' % differ if differ else 'ok'))
+	return 1 if failures else 0
+
+def compare(args):
+	"""
+		Flags cases that are slower, have higher p99 latency or use more memory than base by more than threshold
+	"""
+	base, new = [json.load(open(path))['results'] for path in args.compare]
+	regressions = 0
+	for name in sorted(set(base) & set(new)):
+		old, current = base[name], new[name]
+		if 'skipped' in old or 'skipped' in current:
+			continue
+		checks = [
+			('throughput', old['chars_per_sec'] / max(current['chars_per_sec'], 1e-9) - 1),
+			('p99', current['p99_ms'] / max(old['p99_ms'], 1e-9) - 1),
+			('rss', current['peak_rss_mb'] / max(old['peak_rss_mb'], 1e-9) - 1),
+		]
+		flags = ['%s +%.0f%%' % (metric, 100 * change) for metric, change in checks if change > args.threshold]
+		regressions += bool(flags)
+		print('%-50s %8.0f -> %8.0f chars/s  %s' % (name, old['chars_per_sec'], current['chars_per_sec'], 'REGRESSION: ' + ', '.join(flags) if flags else 'ok'))
+	print('%d regressions' % regressions)
+	return 1 if regressions else 0
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='benchmarks of hazm components')
+	parser.add_argument('--output', help='write results to this json file')
+	parser.add_argument('--only', help='regular expression of case names to run')
+	parser.add_argument('--size', type=int, default=500000, help='characters of sample input (DEFAULT: 500000)')
+	parser.add_argument('--seed', type=int, default=0)
+	parser.add_argument('--workers', type=int, default=1, help='processes of PerStemmer (DEFAULT: 1)')
+	parser.add_argument('--limit', type=int, default=20000, help='maximum units of corpus cases (DEFAULT: 20000)')
+	parser.add_argument('--bijankhan', help='folder of bijankhan.txt')
+	parser.add_argument('--hamshahri', help='root folder of Hamshahri corpus')
+	parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help='compare two result files')
+	parser.add_argument('--threshold', type=float, default=0.1, help='relative change that counts as a regression (DEFAULT: 0.1)')
+	parser.add_argument('--check', action='store_true', help='only check outputs of optimized paths against plain paths')
+	parser.add_argument('--case', help=argparse.SUPPRESS)
+	args = parser.parse_args()
+
+	if args.case:
+		print(json.dumps(measure(args, args.case)))
+	elif args.check:
+		sys.exit(check(args))
+	elif args.compare:
+		sys.exit(compare(args))
+	else:
+		sys.exit(run(args))
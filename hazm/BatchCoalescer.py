@@ -0,0 +1,84 @@
+# asyncio and concurrent.futures are imported on first use, they are most of the import time of the normalizer
+import functools, threading
+
+class BatchCoalescer():
+	"""
+		Collects items submitted by concurrent coroutines into batches and runs function on each
+		batch in an executor, so CPU bound work does not block the event loop and is paid once per
+		batch. A batch is sent when it has batch_size items or delay seconds after its first item.
+		One instance may be shared by event loops in several threads: each loop has its own
+		pending batch, so futures are only resolved in the loop that created them.
+
+		>>> coalescer = BatchCoalescer(functools.partial(map_method, PersianTextNormalizer(), 'cleanup'))
+		>>> await asyncio.gather(*[coalescer.submit(text) for text in texts])
+	"""
+
+	def __init__(self, function, executor=None, batch_size=64, delay=0.002):
+		"""
+			:param function: called with a list of items and returns a list of their results, picklable for process executors
+			:param executor  (optionally): concurrent.futures executor (DEFAULT: a ThreadPoolExecutor with one thread)
+			:param batch_size (optionally): maximum items of a batch (DEFAULT: 64)
+			:param delay      (optionally): maximum seconds an item waits for its batch to fill (DEFAULT: 0.002)
+		"""
+		if executor is None:
+			from concurrent.futures import ThreadPoolExecutor
+			executor = ThreadPoolExecutor(1)
+		self.function = function
+		self.executor = executor
+		self.batch_size = batch_size
+		self.delay = delay
+		# loop: [items, futures, timer] of its pending batch
+		self._pending = {}
+		self._lock = threading.Lock()
+
+	async def submit(self, item):
+		import asyncio
+		loop = asyncio.get_running_loop()
+		future = loop.create_future()
+		with self._lock:
+			batch = self._pending.setdefault(loop, [[], [], None])
+			batch[0].append(item)
+			batch[1].append(future)
+			full = len(batch[0]) >= self.batch_size
+			if not full and batch[2] is None:
+				batch[2] = loop.call_later(self.delay, self._flush, loop)
+		if full:
+			self._flush(loop)
+		return await future
+
+	def _flush(self, loop):
+		# called in the thread of loop, by submit or by the timer
+		with self._lock:
+			items, futures, timer = self._pending.pop(loop, ([], [], None))
+		if timer is not None:
+			timer.cancel()
+		if items:
+			# the callback runs in loop, which created all futures of the batch
+			loop.run_in_executor(self.executor, self.function, items).add_done_callback(functools.partial(self._done, futures))
+
+	@staticmethod
+	def _done(futures, batch):
+		error = batch.exception()
+		results = batch.result() if error is None else None
+		for i, future in enumerate(futures):
+			if future.done():
+				continue
+			if error is not None:
+				future.set_exception(error)
+			else:
+				future.set_result(results[i])
+
+	def shutdown(self):
+		self.executor.shutdown()
+
+def map_method(instance, name, items):
+	""" results of calling method name of instance on each item, a picklable batch function """
+	method = getattr(instance, name)
+	return [method(item) for item in items]
+
+def batch_method(instance, name, items):
+	""" results of calling batch method name of instance on all items, a picklable batch function """
+	return list(getattr(instance, name)(items))
+
+# guards lazy creation of coalescers by async methods of shared instances
+coalescer_lock = threading.Lock()
@@ -1,7 +1,5 @@
 from nltk.corpus import PlaintextCorpusReader
-from sklearn import cross_validation
-import numpy as np
-import re, nltk
+import re, nltk, os, hashlib, sys
 
 bijankhan_root = '/home/server/pltk/data/'
 bijankhan_fileid = 'bijankhan.txt'
@@ -25,29 +23,46 @@ def sents(add_pos=False, separator='/'):
 		>>> len(list(sents()))
 		88137
 	"""
-	lines = open(bijankhan_root + bijankhan_fileid).readlines()
+	for sentence in tagged_sents():
+		if (add_pos == True):
+			yield ' '.join(word + separator + tag for word, tag in sentence)
+		else:
+			yield ' '.join(word for word, tag in sentence)
+
+def tagged_sents():
+	"""
+		Returns list of sentences as lists of (word, tag) tuples, tag strings are interned
+
+		>>> len(list(tagged_sents()))
+		88137
+	"""
 	newLine = True
 	sentence = []
-	for line in lines:
+	for line in open(bijankhan_root + bijankhan_fileid):
 		line = line.strip('\r\n')
-		words = re.split(" +", line)
-
-		if (words[0] == '#'):
+		if (line[:1] == '#' and line[1:2] in ('', ' ')):
 			if (newLine == False):
-				yield ''.join(sentence)
+				yield sentence
 				sentence = []
 			newLine = True
+			continue
+
+		# words of a multi-word token are separated by spaces too, they are joined with _
+		parts = line.rsplit(' ', 1)
+		if (len(parts) == 1):
+			word, tag = '', line
 		else:
-			if (newLine == False):
-				sentence += [" "]
-			sentence += ["_".join(words[0:len(words)-1])]
-			if (add_pos == True):
-				sentence += [separator + words[len(words)-1]]
-			newLine = False
-			if (words[0] == '.' and words[len(words)-1] == 'DELM'):
-				newLine = True
-				yield ''.join(sentence)
-				sentence = []
+			word = parts[0].rstrip(' ')
+			if (' ' in word):
+				word = '_'.join(re.split(" +", word))
+			tag = parts[1]
+		tag = sys.intern(tag)
+		sentence.append((word, tag))
+		newLine = False
+		if (tag == 'DELM' and line.split(' ', 1)[0] == '.'):
+			newLine = True
+			yield sentence
+			sentence = []
 
 def export_sents(output, add_pos=False, separator='/'):
 	"""
@@ -63,24 +78,166 @@ def export_sents(output, add_pos=False, separator='/'):
 	for sent in sents(add_pos, separator):
 		out.write(sent + "\n")
 
-def split_train_test(separator='/', test_size=0.25):
+def _bucket(sent, seed):
+	# position of sentence in [0, 1), the same on every run and machine for a given seed
+	digest = hashlib.md5((str(seed) + '\t' + sent).encode('utf-8')).digest()
+	return int.from_bytes(digest[:8], 'big') / 2.0 ** 64
+
+def split_train_test(separator='/', test_size=0.25, seed=0):
 	"""
+		Splits sentences by a seeded hash of their text, so the split is reproducible
+		without shuffling the whole corpus in memory
+
 		>>> train, test = split_train_test()
 		>>> print(str(len(train)) + ' training data, ' + str(len(test)) + ' test data')
 	"""
-	setences = list(sents(True, separator))
-	return cross_validation.train_test_split(setences, test_size=test_size)
+	train_set, test_set = [], []
+	for sent in sents(True, separator):
+		(test_set if _bucket(sent, seed) < test_size else train_set).append(sent)
+	return train_set, test_set
 
-def export_train_test(train_file, test_file, separator='/', test_size=0.1):
+def export_train_test(train_file, test_file, separator='/', test_size=0.1, dev_file=None, dev_size=0.0, seed=0):
 	"""
+		Writes train, test and (optionally) dev sets in one pass over the corpus with constant memory
+		:param dev_file (optionally): output file of development set (DEFAULT: None)
+		:param dev_size (optionally): part of sentences that goes to dev_file (DEFAULT: 0.0)
+		:param seed 	(optionally): seed of the hash used to split sentences (DEFAULT: 0)
+
 		>>> export_train_test('/home/server/pltk/data/bijankhan-train.txt', '/home/server/pltk/data/bijankhan-test.txt')
 	"""
-	train_set, test_set = split_train_test(separator, test_size)
-
 	train_out = open(train_file, 'w')
-	for sent in train_set:
-		train_out.write(sent + "\n")
-
 	test_out = open(test_file, 'w')
-	for sent in test_set:
-		test_out.write(sent + "\n")
\ No newline at end of file
+	dev_out = open(dev_file, 'w') if dev_file else None
+	for sent in sents(True, separator):
+		bucket = _bucket(sent, seed)
+		if bucket < test_size:
+			test_out.write(sent + "\n")
+		elif dev_out and bucket < test_size + dev_size:
+			dev_out.write(sent + "\n")
+		else:
+			train_out.write(sent + "\n")
+
+	for out in (train_out, test_out, dev_out):
+		if out:
+			out.close()
+
+def export_folds(train_pattern, test_pattern, folds=10, separator='/', seed=0):
+	"""
+		Writes k-fold cross validation sets in one pass over the corpus, fold i is the test set
+		of test_pattern % i and all other folds go to train_pattern % i
+
+		>>> export_folds('/home/server/pltk/data/bijankhan-train-%d.txt', '/home/server/pltk/data/bijankhan-test-%d.txt')
+	"""
+	train_outs = [open(train_pattern % i, 'w') for i in range(folds)]
+	test_outs = [open(test_pattern % i, 'w') for i in range(folds)]
+	for sent in sents(True, separator):
+		fold = int(_bucket(sent, seed) * folds)
+		for i in range(folds):
+			(test_outs[i] if i == fold else train_outs[i]).write(sent + "\n")
+
+	for out in train_outs + test_outs:
+		out.close()
+
+def export_index(output):
+	"""
+		Converts corpus to an indexed binary format that can be opened with load_index
+		:param output: 	output folder, it contains word and tag ids of all tokens, start token of each sentence
+						and the word and tag vocabularies
+
+		>>> export_index('/home/server/pltk/data/bijankhan-index')
+	"""
+	vocab = {}
+	tagset = {}
+	word_ids = []
+	tag_ids = []
+	offsets = [0]
+	for sentence in tagged_sents():
+		for word, tag in sentence:
+			word_ids.append(vocab.setdefault(word, len(vocab)))
+			tag_ids.append(tagset.setdefault(tag, len(tagset)))
+		offsets.append(len(word_ids))
+
+	import numpy as np
+	if not os.path.exists(output):
+		os.makedirs(output)
+	np.save(os.path.join(output, 'words.npy'), np.array(word_ids, dtype=np.uint32))
+	np.save(os.path.join(output, 'tags.npy'), np.array(tag_ids, dtype=np.uint16))
+	np.save(os.path.join(output, 'offsets.npy'), np.array(offsets, dtype=np.int64))
+	for name, ids in (('words.txt', vocab), ('tags.txt', tagset)):
+		with open(os.path.join(output, name), 'w', encoding='utf-8') as out:
+			out.write('\n'.join(sorted(ids, key=ids.get)))
+
+def load_index(path):
+	"""
+		Returns BijankhanIndex of a folder created by export_index
+
+		>>> index = load_index('/home/server/pltk/data/bijankhan-index')
+		>>> len(index)
+		88137
+	"""
+	return BijankhanIndex(path)
+
+class BijankhanIndex():
+	"""
+		Memory-mapped view of an indexed corpus, sentences are located in O(1) with
+		the sentence offset table and only their own tokens are read from disk.
+
+		>>> index[0] == list(index[:1])[0]
+		True
+		>>> index.sents(0) == next(sents())
+		True
+	"""
+
+	def __init__(self, path):
+		import numpy as np
+		self._words = np.load(os.path.join(path, 'words.npy'), mmap_mode='r')
+		self._tags = np.load(os.path.join(path, 'tags.npy'), mmap_mode='r')
+		self._offsets = np.load(os.path.join(path, 'offsets.npy'), mmap_mode='r')
+		with open(os.path.join(path, 'words.txt'), encoding='utf-8') as vocab:
+			self.vocab = vocab.read().split('\n')
+		with open(os.path.join(path, 'tags.txt'), encoding='utf-8') as tagset:
+			self.tagset = tagset.read().split('\n')
+
+	def __len__(self):
+		return len(self._offsets) - 1
+
+	def __getitem__(self, i):
+		"""
+			Returns list of (word, tag) of i-th sentence, or list of sentences for a slice
+		"""
+		if isinstance(i, slice):
+			return [self[j] for j in range(*i.indices(len(self)))]
+		if i < 0:
+			i += len(self)
+		if not 0 <= i < len(self):
+			raise IndexError('sentence index out of range')
+		start, end = self._offsets[i], self._offsets[i+1]
+		vocab, tagset = self.vocab, self.tagset
+		return [(vocab[w], tagset[t]) for w, t in zip(self._words[start:end].tolist(), self._tags[start:end].tolist())]
+
+	def sents(self, i=None, add_pos=False, separator='/'):
+		"""
+			Returns i-th sentence as sents() formats it, or all sentences if i is None
+		"""
+		if i is None:
+			return (self._format(self[j], add_pos, separator) for j in range(len(self)))
+		return self._format(self[i], add_pos, separator)
+
+	def _format(self, sentence, add_pos, separator):
+		if (add_pos == True):
+			return ' '.join(word + separator + tag for word, tag in sentence)
+		return ' '.join(word for word, tag in sentence)
+
+
+if __name__ == '__main__':
+	# throughput of tagged_sents against formatting sentences and splitting them back with str2tuple
+	from nltk.tag import str2tuple
+	import time
+
+	start = time.time()
+	count = sum(len([str2tuple(t) for t in sent.split()]) for sent in sents(True))
+	print('sents + str2tuple: %d tokens/s' % (count / (time.time() - start)))
+
+	start = time.time()
+	count = sum(len(sentence) for sentence in tagged_sents())
+	print('tagged_sents:      %d tokens/s' % (count / (time.time() - start)))
@@ -0,0 +1,131 @@
+from array import array
+import hashlib, os, struct
+
+class HamshahriCache():
+	"""
+		On-disk cache of preprocessed Hamshahri files. Each fileid is stored once per
+		normalizer configuration with its normalized texts, sentences and tokens, and is
+		rebuilt when size or mtime of the source file changes.
+
+		File layout (little endian):
+			magic, header (source size, source mtime, config digest, documents, sentences, tokens)
+			sentences per document (uint32), tokens per sentence (uint32)
+			then three length-prefixed utf-8 blobs: texts (with end offsets), sentences and tokens joined by newline
+	"""
+
+	_magic = b'HZMC'
+	_version = 3
+	_header = struct.Struct('<4sHQQ16sIII')
+	_length = struct.Struct('<Q')
+
+	def __init__(self, cache_dir):
+		self.cache_dir = cache_dir
+
+	def entry(self, reader, fid, normalizer, tokenizer):
+		"""
+			Returns CacheEntry of fid, building it from reader on first use or when the source has changed
+		"""
+		path = self.path(fid, normalizer)
+		source = os.stat(reader.abspath(fid))
+		digest = self.digest(normalizer)
+
+		try:
+			with open(path, 'rb') as cache:
+				entry = self._read(cache, source, digest)
+			if entry is not None:
+				return entry
+		except (IOError, struct.error, ValueError):
+			pass
+
+		entry = self._build(reader, fid, normalizer, tokenizer)
+		self._write(path, entry, source, digest)
+		return entry
+
+	def path(self, fid, normalizer):
+		return os.path.join(self.cache_dir, fid + '.' + self.digest(normalizer).hex()[:16] + '.cache')
+
+	def digest(self, normalizer):
+		# constructor flags of PersianTextNormalizer are its boolean attributes, protected spans are
+		# keyed by their resolved pattern, so a changed protected_patterns entry is a new config too
+		if normalizer is None:
+			config = 'raw'
+		else:
+			protect = normalizer._protect_pattern.pattern if normalizer._protect_pattern is not None else None
+			config = type(normalizer).__name__ + repr(sorted((key, value) for key, value in vars(normalizer).items() if isinstance(value, bool))) + repr(protect)
+		return hashlib.md5((str(self._version) + config).encode('utf-8')).digest()
+
+	def _build(self, reader, fid, normalizer, tokenizer):
+		entry = CacheEntry()
+		for document in reader.iterdocs(fid, images=False):
+			text = document.text
+			if normalizer is not None:
+				text = normalizer.cleanup(text)
+			sents = tokenizer.sent_tokenize(text)
+			entry.texts.append(text)
+			entry.sents.append(sents)
+			entry.words.append([tokenizer.word_tokenize(sent) for sent in sents])
+		return entry
+
+	def _write(self, path, entry, source, digest):
+		sents_per_doc = array('I', [len(sents) for sents in entry.sents])
+		tokens_per_sent = array('I', [len(words) for doc in entry.words for words in doc])
+		texts = [text.encode('utf-8') for text in entry.texts]
+		text_ends = array('Q')
+		end = 0
+		for text in texts:
+			end += len(text)
+			text_ends.append(end)
+		sents = '\n'.join(sent for doc in entry.sents for sent in doc).encode('utf-8')
+		tokens = '\n'.join(token for doc in entry.words for words in doc for token in words).encode('utf-8')
+
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		temp = path + '.%d.tmp' % os.getpid()
+		with open(temp, 'wb') as cache:
+			cache.write(self._header.pack(self._magic, self._version, source.st_size, source.st_mtime_ns, digest, len(sents_per_doc), len(tokens_per_sent), sum(tokens_per_sent)))
+			sents_per_doc.tofile(cache)
+			tokens_per_sent.tofile(cache)
+			text_ends.tofile(cache)
+			for blob in (b''.join(texts), sents, tokens):
+				cache.write(self._length.pack(len(blob)))
+				cache.write(blob)
+		os.replace(temp, path)
+
+	def _read(self, cache, source, digest):
+		magic, version, size, mtime, config, n_docs, n_sents, n_tokens = self._header.unpack(cache.read(self._header.size))
+		if magic != self._magic or version != self._version or size != source.st_size or mtime != source.st_mtime_ns or config != digest:
+			return None
+
+		sents_per_doc = array('I')
+		sents_per_doc.fromfile(cache, n_docs)
+		tokens_per_sent = array('I')
+		tokens_per_sent.fromfile(cache, n_sents)
+		text_ends = array('Q')
+		text_ends.fromfile(cache, n_docs)
+		texts, sents, tokens = [cache.read(self._length.unpack(cache.read(self._length.size))[0]) for i in range(3)]
+
+		entry = CacheEntry()
+		start = 0
+		for end in text_ends:
+			entry.texts.append(texts[start:end].decode('utf-8'))
+			start = end
+
+		sents = sents.decode('utf-8').split('\n') if n_sents else []
+		tokens = tokens.decode('utf-8').split('\n') if n_tokens else []
+		s = t = 0
+		for count in sents_per_doc:
+			entry.sents.append(sents[s:s+count])
+			words = []
+			for length in tokens_per_sent[s:s+count]:
+				words.append(tokens[t:t+length])
+				t += length
+			entry.words.append(words)
+			s += count
+		return entry
+
+class CacheEntry():
+	""" normalized texts, sentences and words of each document in a file """
+
+	def __init__(self):
+		self.texts = []
+		self.sents = []
+		self.words = []
@@ -1,13 +1,21 @@
 from __future__ import print_function
 from nltk.corpus import PlaintextCorpusReader
-from pyquery import PyQuery as pq
+from lxml import etree
+import lxml.html
 from hazm.PersianTextNormalizer import *
 from hazm.PersianTokenizer import *
-import nltk, os, re, sys
+from hazm.HamshahriCache import *
+import nltk, os, re, sys, collections, multiprocessing, queue
 
 class HamshahriReader():
-	def __init__(self, 	hamshahri_root):
+	def __init__(self, 	hamshahri_root, cache_dir=None):
+		"""
+			:param cache_dir (optionally): directory to keep preprocessed files in, so texts, sents and words
+				skip parsing and normalization after the first run (DEFAULT: None)
+		"""
 		self.hamshahri_root = hamshahri_root
+		self.cache_dir = cache_dir
+		self._cache = HamshahriCache(cache_dir) if cache_dir else None
 
 	def years(self):
 		"""
@@ -67,6 +75,16 @@ class HamshahriReader():
 		wordlists = PlaintextCorpusReader(self.hamshahri_root, fileid)
 		return wordlists.raw(fileid)
 		
+	def _fids(self, years, fids):
+		if type(years) is int:
+			years = [str(years)]
+
+		if (fids == '*'):
+			return self.fileids(years)
+		elif type(fids) is str:
+			return [fids]
+		return fids
+
 	def docs(self, years='*', fids='*'):
 		"""
 			Returns list of Document objects that contains information of each document in hamshahri corpus
@@ -77,37 +95,91 @@ class HamshahriReader():
 			>>> list(hr.docs(fids='1996/HAM2-961221.xml'))[10].category
 			'Science and Culture'
 		"""
-		if type(years) is int:
-			years = [str(years)]
-		
-		if (fids == '*'):
-			fids = self.fileids(years)
-		elif type(years) is str:
-			fids = [fids]
+		fids = self._fids(years, fids)
 
 		for fid in fids:
-			try:
-				corpus = self.raw(fid)
-				corpus = corpus.replace('<![CDATA[', '').replace(']]>', '')
-				corpus = corpus.encode('utf-8')
-				d = pq(corpus, parser='html')
-				for doc in d('DOC'):
-					dc = pq(doc)
-					document = Document()
-					document.id = dc('DOCID').text()
-					document.number = dc('DOCNO').text()
-					document.originalfile = dc('ORIGINALFILE').text()
-					document.issue = dc('ISSUE').text()
-					document.date = dc('DATE[calender=Western]').text()
-					document.persiandate = dc('DATE[calender=Persian]').text()
-					document.category = dc('CAT[xml\:lang=en]').text()
-					document.persiancategory = dc('CAT[xml\:lang=fa]').text()
-					document.title = dc('TITLE').text()
-					document.text = dc('TEXT').text()
-					yield  document
-			except:
-				print('Format of "' + fid + '" file is not appropriate', file=sys.stderr)
+			for document in self.iterdocs(fid):
+				yield document
 			
+	# tags that do not start a new line in PyQuery.text(), other tags do
+	_inline_tags = {'a', 'abbr', 'acronym', 'b', 'bdo', 'big', 'button', 'cite', 'code', 'dfn', 'em', 'font', 'i', 'img', 'input', 'kbd', 'label', 'map', 'object', 'q', 'samp', 'select', 'small', 'span', 'strike', 'strong', 'sub', 'sup', 'textarea', 'tt', 'u', 'var'}
+	_xml_lang = '{http://www.w3.org/XML/1998/namespace}lang'
+
+	def iterdocs(self, fid, images=True):
+		"""
+			Yields Document objects of fid one by one while the file is parsed incrementally,
+			so memory use does not grow with the size of the file
+			:param images (optionally): keep text of <image> tags in Document.text (DEFAULT: True)
+
+			>>> next(hr.iterdocs('1996/HAM2-961221.xml')).id
+			'HAM2-751001-001'
+		"""
+		try:
+			for event, doc in etree.iterparse(self.abspath(fid), events=('end',), tag='DOC', recover=True, huge_tree=True, strip_cdata=False):
+				document = Document()
+				for field in doc:
+					if field.tag == 'DOCID':
+						document.id = self._text(field)
+					elif field.tag == 'DOCNO':
+						document.number = self._text(field)
+					elif field.tag == 'ORIGINALFILE':
+						document.originalfile = self._text(field)
+					elif field.tag == 'ISSUE':
+						document.issue = self._text(field)
+					elif field.tag == 'DATE' and field.get('calender') == 'Western':
+						document.date = self._text(field)
+					elif field.tag == 'DATE' and field.get('calender') == 'Persian':
+						document.persiandate = self._text(field)
+					elif field.tag == 'CAT' and field.get(self._xml_lang) == 'en':
+						document.category = self._text(field)
+					elif field.tag == 'CAT' and field.get(self._xml_lang) == 'fa':
+						document.persiancategory = self._text(field)
+					elif field.tag == 'TITLE':
+						document.title = self._text(field)
+					elif field.tag == 'TEXT':
+						document.text = self._text(field, images)
+
+				# free parsed documents, so the tree never holds more than one DOC
+				doc.clear()
+				while doc.getprevious() is not None:
+					del doc.getparent()[0]
+				yield document
+		except (etree.LxmlError, IOError):
+			print('Format of "' + fid + '" file is not appropriate', file=sys.stderr)
+
+	def _text(self, element, images=True):
+		# content of fields is html, in CDATA sections or as elements, and is parsed as the
+		# PyQuery version did: CDATA markers removed, then one html parse, so entities are
+		# decoded once. Block elements and line breaks of paragraphs are kept as newlines,
+		# other spaces are squashed.
+		if element.text is None and len(element) == 0:
+			return ''
+		source = etree.tostring(element, encoding='unicode', with_tail=False)
+		source = source[source.index('>')+1:source.rindex('<')].replace('<![CDATA[', '').replace(']]>', '')
+		parts = []
+		self._html_text(lxml.html.fragment_fromstring(source, create_parent='div'), images, parts)
+		return '\n'.join(line for line in (' '.join(line.split()) for line in ''.join(parts).split('\n')) if line)
+
+	def _html_text(self, node, images, parts):
+		if not isinstance(node.tag, str):
+			# comments and processing instructions
+			return
+		tag = node.tag.lower()
+		if tag == 'image' and not images:
+			parts.append('\n')
+			return
+		block = tag not in self._inline_tags
+		if block:
+			parts.append('\n')
+		if node.text:
+			parts.append(node.text)
+		for child in node:
+			self._html_text(child, images, parts)
+			if child.tail:
+				parts.append(child.tail)
+		if block:
+			parts.append('\n')
+
 	def categories(self, years='*', fids='*', lang='en'):
 		"""
 			Returns list of categories
@@ -124,26 +196,11 @@ class HamshahriReader():
 			>>> len(hr.categories(fids='1996/HAM2-961221.xml',lang='fa'))
 			10
 		"""
-		if type(years) is int:
-			years = [str(years)]
-		
-		if (fids == '*'):
-			fids = self.fileids(years)
-		elif type(years) is str:
-			fids = [fids]
-			
+		fids = self._fids(years, fids)
 		categories = set()
 		for fid in fids:
-			try:
-				corpus = self.raw(fid)
-				corpus = corpus.replace('<![CDATA[', '').replace(']]>', '')
-				corpus = corpus.encode('utf-8')
-
-				d = pq(corpus, parser='html')
-				for cat in d('CAT[xml\:lang=' + lang + ']'):
-					categories.add(pq(cat).text())
-			except:
-				print('Format of "' + fid + '" file is not appropriate', file=sys.stderr)
+			for document in self.iterdocs(fid):
+				categories.add(document.category if lang == 'en' else document.persiancategory)
 		return list(categories)
 
 	def texts(self, years='*', fids='*', normalize=True):
@@ -153,55 +210,118 @@ class HamshahriReader():
 			>>> len(list(hr.texts(fids='1996/HAM2-961221.xml'))[0])
 			2243
 		"""
-		if type(years) is int:
-			years = [str(years)]
-		
-		if (fids == '*'):
-			fids = self.fileids(years)
-		elif type(years) is str:
-			fids = [fids]
+		fids = self._fids(years, fids)
 
 		normalizer = PersianTextNormalizer()
-			
-		for fid in fids:
-			try:
-				corpus = self.raw(fid)
-				corpus = corpus.replace('<![CDATA[', '').replace(']]>', '')
-				corpus = corpus.encode('utf-8')
-				d = pq(corpus, parser='html')
-				for cat in d('TEXT'):
-					data = pq(cat)
-					data.remove('image')
-					text = data.text()
-					if (normalize == True):
-						text = normalizer.cleanup(text)
+
+		if self._cache:
+			tokenizer = PersianTokenizer()
+			for fid in fids:
+				for text in self._cache.entry(self, fid, normalizer if normalize else None, tokenizer).texts:
 					yield text
-			except:
-				print('Format of "' + fid + '" file is not appropriate', file=sys.stderr)
+			return
+
+		for fid in fids:
+			for document in self.iterdocs(fid, images=False):
+				text = document.text
+				if (normalize == True):
+					text = normalizer.cleanup(text)
+				yield text
 		
-	def sents(self, years='*', fids='*', normalize=True):
+	def sents(self, years='*', fids='*', normalize=True, workers=1, ordered=True, prefetch=None):
 		"""
 			Returns list of sentences
+			:param workers  (optionally): number of processes that normalize and tokenize files in parallel (DEFAULT: 1)
+			:param ordered  (optionally): with workers, yield files in fids order instead of as soon as they are done (DEFAULT: True)
+			:param prefetch (optionally): with workers, maximum number of files processed ahead of the consumer (DEFAULT: 2 * workers)
 		
 			>>> len(list(hr.sents(fids='1996/HAM2-961221.xml'))[0])
 			173
 		"""
-		tokenizer = PersianTokenizer()
-		for text in self.texts(years, fids, normalize):
-			for sent in tokenizer.sent_tokenize(text):
-				yield sent
+		return self._sentences(years, fids, normalize, False, workers, ordered, prefetch)
 
-		
-	def words(self, years='*', fids='*', normalize=True):
+	def words(self, years='*', fids='*', normalize=True, workers=1, ordered=True, prefetch=None):
 		"""
 			Returns a list contains list of words in each sentence
+			:param workers, ordered, prefetch (optionally): same as sents
 		
 			>>> len(list(hr.words(fids='1996/HAM2-961221.xml'))[0])
 			39
 		"""
-		tokenizer = PersianTokenizer()
-		for sent in self.sents(years, fids, normalize):
-			yield tokenizer.word_tokenize(sent)
+		return self._sentences(years, fids, normalize, True, workers, ordered, prefetch)
+
+	def _sentences(self, years, fids, normalize, words, workers, ordered, prefetch):
+		fids = self._fids(years, fids)
+		if (workers <= 1):
+			normalizer = PersianTextNormalizer() if normalize else None
+			tokenizer = PersianTokenizer()
+			for fid in fids:
+				for sent in self._file_sentences(fid, normalizer, tokenizer, words):
+					yield sent
+			return
+
+		if prefetch is None:
+			prefetch = 2 * workers
+		pool = multiprocessing.Pool(workers, _init_worker, (self.hamshahri_root, self.cache_dir, normalize))
+		try:
+			if (ordered):
+				pending = collections.deque()
+				for fid in fids:
+					pending.append(pool.apply_async(_worker_sentences, (fid, words)))
+					if len(pending) >= prefetch:
+						for sent in pending.popleft().get():
+							yield sent
+				while pending:
+					for sent in pending.popleft().get():
+						yield sent
+			else:
+				done = queue.Queue()
+				running = 0
+				for fid in fids:
+					pool.apply_async(_worker_sentences, (fid, words), callback=lambda result: done.put((result, None)), error_callback=lambda error: done.put((None, error)))
+					running += 1
+					while running >= prefetch or (running and not done.empty()):
+						result, error = done.get()
+						running -= 1
+						if error is not None:
+							raise error
+						for sent in result:
+							yield sent
+				while running:
+					result, error = done.get()
+					running -= 1
+					if error is not None:
+						raise error
+					for sent in result:
+						yield sent
+		finally:
+			pool.terminate()
+
+	def _file_sentences(self, fid, normalizer, tokenizer, words):
+		if self._cache:
+			entry = self._cache.entry(self, fid, normalizer, tokenizer)
+			for doc in (entry.words if words else entry.sents):
+				for sent in doc:
+					yield sent
+			return
+
+		for document in self.iterdocs(fid, images=False):
+			text = document.text
+			if normalizer is not None:
+				text = normalizer.cleanup(text)
+			for sent in tokenizer.sent_tokenize(text):
+				yield tokenizer.word_tokenize(sent) if words else sent
+
+# each worker process of sents/words keeps its own reader, normalizer and tokenizer
+_worker = None
+
+def _init_worker(hamshahri_root, cache_dir, normalize):
+	global _worker
+	_worker = (HamshahriReader(hamshahri_root, cache_dir), PersianTextNormalizer() if normalize else None, PersianTokenizer())
+
+def _worker_sentences(fid, words):
+	reader, normalizer, tokenizer = _worker
+	return list(reader._file_sentences(fid, normalizer, tokenizer, words))
 
 class Document:
 	id = ''
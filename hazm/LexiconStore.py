@@ -0,0 +1,130 @@
+from bisect import bisect_left
+import mmap, os, struct
+
+class LexiconStore():
+	"""
+		Read-only sorted lexicon in one file, opened with mmap so processes that use the same
+		file share its pages instead of each loading the words into its own heap.
+		Lookups are binary searches over the offset index, O(log n) without reading other entries.
+
+		File layout (little endian):
+			magic, version, number of entries
+			end offset of each entry (uint64)
+			entries sorted by key, each is utf-8 key, NUL and utf-8 value
+
+		>>> LexiconStore.build('data/lexicon.lex', [('کتاب', 'N'), ('کتابخانه', 'N'), ('خورد', 'V')])
+		>>> lexicon = LexiconStore('data/lexicon.lex')
+		>>> lexicon.get('کتاب')
+		'N'
+		>>> [key for key, value in lexicon.prefix('کتاب')]
+		['کتاب', 'کتابخانه']
+	"""
+
+	_magic = b'HZML'
+	_version = 1
+	_header = struct.Struct('<4sHQ')
+	_end = struct.Struct('<Q')
+
+	@classmethod
+	def build(cls, path, items):
+		"""
+			Writes a store of items, keys or (key, value) pairs, a later value of a key is ignored
+		"""
+		entries = {}
+		for item in items:
+			key, value = (item, '') if isinstance(item, str) else item
+			if '\0' in key:
+				raise Exception("Lexicon key contains NUL: %r" % key)
+			entries.setdefault(key, value)
+
+		# utf-8 byte order is the same as code point order, so the blob is sorted by bytes too
+		blobs = [key.encode('utf-8') + b'\0' + value.encode('utf-8') for key, value in sorted(entries.items())]
+		directory = os.path.dirname(path)
+		if directory and not os.path.exists(directory):
+			os.makedirs(directory)
+		temp = path + '.%d.tmp' % os.getpid()
+		with open(temp, 'wb') as output:
+			output.write(cls._header.pack(cls._magic, cls._version, len(blobs)))
+			end = 0
+			for blob in blobs:
+				end += len(blob)
+				output.write(struct.pack('<Q', end))
+			for blob in blobs:
+				output.write(blob)
+		os.replace(temp, path)
+
+	def __init__(self, path):
+		self.path = path
+		with open(path, 'rb') as lexicon:
+			self._mmap = mmap.mmap(lexicon.fileno(), 0, access=mmap.ACCESS_READ)
+		magic, version, self._size = self._header.unpack_from(self._mmap, 0)
+		if magic != self._magic or version != self._version:
+			raise Exception("%s is not a lexicon store" % path)
+		self._ends = self._header.size
+		self._data = self._ends + 8 * self._size
+		self._keys = _Keys(self)
+
+	def _entry(self, i):
+		# end offsets are read as little endian on any platform, a native memoryview cast would not be
+		start = self._data + (self._end.unpack_from(self._mmap, self._ends + 8 * (i-1))[0] if i else 0)
+		return self._mmap[start:self._data + self._end.unpack_from(self._mmap, self._ends + 8 * i)[0]]
+
+	def _key(self, i):
+		entry = self._entry(i)
+		return entry[:entry.index(b'\0')]
+
+	def _item(self, i):
+		key, value = self._entry(i).split(b'\0', 1)
+		return key.decode('utf-8'), value.decode('utf-8')
+
+	def __len__(self):
+		return self._size
+
+	def __getitem__(self, i):
+		"""
+			Returns (key, value) of i-th entry in key order
+		"""
+		if i < 0:
+			i += self._size
+		if not 0 <= i < self._size:
+			raise IndexError('lexicon index out of range')
+		return self._item(i)
+
+	def __iter__(self):
+		for i in range(self._size):
+			yield self._item(i)
+
+	def __contains__(self, key):
+		return self.get(key) is not None
+
+	def get(self, key, default=None):
+		key = key.encode('utf-8')
+		i = bisect_left(self._keys, key)
+		if i < self._size and self._key(i) == key:
+			return self._item(i)[1]
+		return default
+
+	def prefix(self, prefix):
+		"""
+			Yields (key, value) of entries whose key starts with prefix, in key order
+		"""
+		prefix = prefix.encode('utf-8')
+		for i in range(bisect_left(self._keys, prefix), self._size):
+			if not self._key(i).startswith(prefix):
+				break
+			yield self._item(i)
+
+	def close(self):
+		self._mmap.close()
+
+class _Keys():
+	""" sequence view of store keys as bytes, for bisect """
+
+	def __init__(self, store):
+		self._store = store
+
+	def __len__(self):
+		return len(self._store)
+
+	def __getitem__(self, i):
+		return self._store._key(i)
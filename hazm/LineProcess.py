@@ -0,0 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor
+import subprocess, queue, threading
+
+class LineProcess():
+	"""
+		a long-lived process that answers each line written to its stdin with one line on its stdout,
+		empty lines are answered with '' without being written, and a process that does not answer
+		within timeout seconds is killed and started again
+	"""
+
+	def __init__(self, cmd, batch_size=64, encoding='utf-8', timeout=60):
+		self.cmd = cmd
+		self.batch_size = batch_size
+		self.encoding = encoding
+		self.timeout = timeout
+		self._process = None
+		self._output = None
+
+	def start(self):
+		self._process = subprocess.Popen(self.cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+		self._output = queue.Queue()
+		threading.Thread(target=self._read, args=(self._process.stdout, self._output), daemon=True).start()
+
+	@staticmethod
+	def _read(stdout, output):
+		# stdout is read here, so a read timeout does not leave a half read line behind
+		for line in iter(stdout.readline, b''):
+			output.put(line)
+		output.put(b'')
+		stdout.close()
+
+	def close(self):
+		if self._process is None:
+			return
+		process, self._process = self._process, None
+		try:
+			process.stdin.close()
+			process.wait(timeout=5)
+		except Exception:
+			process.kill()
+			process.wait()
+
+	def communicate(self, lines):
+		"""
+			Returns output line of each input line, restarting the process once if it has crashed or timed out
+		"""
+		lines = [line.replace('\r', ' ').replace('\n', ' ') for line in lines]
+		requests = [(line + '\n').encode(self.encoding) for line in lines if line.strip()]
+		if not requests:
+			return ['' for line in lines]
+		try:
+			outputs = self._communicate(requests)
+		except (IOError, EOFError):
+			self.close()
+			outputs = self._communicate(requests)
+
+		outputs = iter(outputs)
+		return [next(outputs) if line.strip() else '' for line in lines]
+
+	def _communicate(self, lines):
+		if self._process is None or self._process.poll() is not None:
+			self.close()
+			self.start()
+
+		# write and read in small batches, so neither side blocks on a full pipe
+		outputs = []
+		for i in range(0, len(lines), self.batch_size):
+			batch = lines[i:i+self.batch_size]
+			self._process.stdin.write(b''.join(batch))
+			self._process.stdin.flush()
+			for line in batch:
+				try:
+					output = self._output.get(timeout=self.timeout)
+				except queue.Empty:
+					self._process.kill()
+					raise EOFError('%s did not answer in %s seconds' % (self.cmd[0], self.timeout))
+				if not output:
+					raise EOFError('%s exited with code %s' % (self.cmd[0], self._process.poll()))
+				outputs.append(output.decode(self.encoding).rstrip('\r\n'))
+		return outputs
+
+class LineProcessPool():
+	""" a pool of LineProcess instances of the same command, processes are started on first use """
+
+	def __init__(self, cmd, size=1, batch_size=64, encoding='utf-8', timeout=60):
+		self.size = size
+		self._processes = [LineProcess(cmd, batch_size, encoding, timeout) for i in range(size)]
+		self._idle = queue.Queue()
+		for process in self._processes:
+			self._idle.put(process)
+
+	def communicate(self, lines):
+		"""
+			Returns output line of each input line, spreading lines over the processes
+		"""
+		lines = list(lines)
+		size = max(1, -(-len(lines) // self.size))
+		chunks = [lines[i:i+size] for i in range(0, len(lines), size)]
+		if (len(chunks) <= 1):
+			return self._communicate(lines)
+
+		with ThreadPoolExecutor(len(chunks)) as executor:
+			return [output for outputs in executor.map(self._communicate, chunks) for output in outputs]
+
+	def _communicate(self, lines):
+		process = self._idle.get()
+		try:
+			return process.communicate(lines)
+		finally:
+			self._idle.put(process)
+
+	def close(self):
+		for process in self._processes:
+			process.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
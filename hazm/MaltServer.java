@@ -0,0 +1,43 @@
+import java.io.*;
+import org.maltparser.MaltParserService;
+
+/*
+	Keeps a MaltParser model loaded and parses one sentence per line of stdin:
+		word1 \t tag1 \t word2 \t tag2 ...
+	and answers each with one line of heads and relations:
+		head1 \t rel1 \t head2 \t rel2 ...
+	An empty line is written for a sentence that could not be parsed, so the streams stay in step.
+
+	usage: java -cp malt.jar MaltServer.java <mco> <working_dir>
+*/
+public class MaltServer {
+	public static void main(String[] args) throws Exception {
+		MaltParserService service = new MaltParserService();
+		service.initializeParserModel("-c " + args[0] + " -m parse -w " + args[1] + " -lfi parser.log");
+
+		BufferedReader in = new BufferedReader(new InputStreamReader(System.in, "UTF-8"));
+		PrintWriter out = new PrintWriter(new BufferedWriter(new OutputStreamWriter(System.out, "UTF-8")));
+		String line;
+		while ((line = in.readLine()) != null) {
+			String[] fields = line.split("\t", -1);
+			String[] tokens = new String[fields.length / 2];
+			for (int i = 0; i < tokens.length; i++)
+				tokens[i] = (i + 1) + "\t" + fields[2*i] + "\t_\t" + fields[2*i+1] + "\t" + fields[2*i+1] + "\t_";
+
+			StringBuilder result = new StringBuilder();
+			try {
+				for (String token : service.parseTokens(tokens)) {
+					String[] columns = token.split("\t");
+					if (result.length() > 0)
+						result.append('\t');
+					result.append(columns[6]).append('\t').append(columns[7]);
+				}
+			} catch (Exception e) {
+				result.setLength(0);
+			}
+			out.println(result);
+			out.flush();
+		}
+		service.terminateParserModel();
+	}
+}
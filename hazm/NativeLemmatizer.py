@@ -0,0 +1,182 @@
+# coding=utf8
+
+from bisect import bisect_left
+from hazm.LexiconStore import *
+import re
+
+class NativeLemmatizer():
+	"""
+		Virastyar style lemmatizer in python. Prefixes and suffixes are stripped by rules
+		and stems are checked in a Dic.dat style lexicon (one word per line, tab separated
+		fields after the word are frequency and pos), kept as sorted arrays of keys and words.
+		The lexicon can be saved as a LexiconStore, which worker processes share with mmap.
+		Options have the same meaning as VirastyarPersianLemmatizer options.
+
+		>>> NativeLemmatizer(lexicon=['کتاب', 'خوردن\\t1\\tV']).lemma('کتاب‌ها')
+		'کتاب'
+		>>> NativeLemmatizer().lemma('می‌خورم')
+		'خور'
+		>>> NativeLemmatizer().lemma('کتاب‌هایشان')
+		'کتاب'
+		>>> [NativeLemmatizer().lemma(word) for word in ['میوه', 'سیاست', 'ایران', 'مردم']]
+		['میوه', 'سیاست', 'ایران', 'مردم']
+		>>> NativeLemmatizer('./Dic.dat').save_lexicon('data/lemmatizer.lex')
+		>>> NativeLemmatizer('data/lemmatizer.lex').lemma('کتاب‌ها')
+	"""
+
+	# suffixes that are written with zwnj or space, with string_matching they may be attached too
+	detached_suffixes = ['هایشان', 'هایتان', 'هایمان', 'هایش', 'هایت', 'هایم', 'هایی', 'های', 'ها', 'ترین', 'تر', 'ام', 'ای', 'ایم', 'اید', 'اند', 'است']
+	noun_suffixes = ['شان', 'تان', 'مان', 'یان', 'ان', 'ات', 'ش', 'ت', 'م', 'ی']
+	verb_suffixes = ['یم', 'ید', 'ند', 'م', 'ی', 'د']
+	verb_prefixes = ['نمی', 'می']
+	min_stem = 2
+
+	_diacritics = re.compile('[\u064b-\u065f\u0670]')
+	_letters = str.maketrans('كيأإآۀة', 'کیاااهه')
+
+	def __init__(self, lexicon=None, string_matching=True, phonetic_comparison=True, ignore_lexicalLemma=False, ignore_declentionRules=True):
+		"""
+			:param lexicon (optionally): Dic.dat file (e.g. ./Dic.dat of Virastyar), list of its lines, LexiconStore (or its .lex file) or None for rules only (DEFAULT: None)
+			:param string_matching (optionally): ignore pseudo spaces (zwnj) between stem and affixes (DEFAULT: True)
+			:param phonetic_comparison (optionally): ignore diacritics and letter variants in lexicon lookups (DEFAULT: True)
+			:param ignore_lexicalLemma (optionally): lemmatize by rules only, without checking the lexicon (DEFAULT: False)
+			:param ignore_declentionRules (optionally): strip verb prefixes from any word, not only verbs (DEFAULT: True)
+		"""
+		self.string_matching = string_matching
+		self.phonetic_comparison = phonetic_comparison
+		self.ignore_lexicalLemma = ignore_lexicalLemma
+		self.ignore_declentionRules = ignore_declentionRules
+
+		self._store = None
+		if isinstance(lexicon, str) and lexicon.endswith('.lex'):
+			lexicon = LexiconStore(lexicon)
+		if isinstance(lexicon, LexiconStore):
+			# keys of a store are already normalized, with the options it was saved with
+			if lexicon.get('') != self._options():
+				raise Exception("%s was saved with other string_matching or phonetic_comparison options" % lexicon.path)
+			self._store = lexicon
+			lexicon = None
+
+		words, verbs = {}, set()
+		lines = open(lexicon, encoding='utf-8') if isinstance(lexicon, str) else (lexicon or [])
+		for line in lines:
+			fields = line.rstrip('\r\n').split('\t')
+			if not fields[0]:
+				continue
+			key = self._key(fields[0])
+			words.setdefault(key, fields[0])
+			if len(fields) > 2 and fields[2].startswith('V'):
+				verbs.add(key)
+		self._keys = sorted(words)
+		self._words = [words[key] for key in self._keys]
+		self._verbs = verbs
+
+	def _options(self):
+		return 'string_matching=%d phonetic_comparison=%d' % (self.string_matching, self.phonetic_comparison)
+
+	def save_lexicon(self, path):
+		"""
+			Writes the lexicon as a LexiconStore file, values are lexicon forms with a tab and V for verbs
+		"""
+		items = [('', self._options())]
+		if self._store is not None:
+			items += [item for item in self._store if item[0]]
+		else:
+			items += [(key, word + ('\tV' if key in self._verbs else '')) for key, word in zip(self._keys, self._words)]
+		LexiconStore.build(path, items)
+
+	def _key(self, word):
+		if self.phonetic_comparison:
+			word = self._diacritics.sub('', word).translate(self._letters)
+		if self.string_matching:
+			word = word.replace('‌', '')
+		return word
+
+	def lookup(self, word):
+		"""
+			Returns lexicon form of word, or None
+		"""
+		key = self._key(word)
+		if self._store is not None:
+			value = self._store.get(key) if key else None
+			return None if value is None else value.split('\t')[0]
+		i = bisect_left(self._keys, key)
+		if i < len(self._keys) and self._keys[i] == key:
+			return self._words[i]
+		return None
+
+	def _is_verb(self, word):
+		key = self._key(word)
+		if self._store is not None:
+			return (self._store.get(key) or '').endswith('\tV')
+		return key in self._verbs
+
+	def candidates(self, token):
+		"""
+			Returns stems of token by rules, less stripped first
+		"""
+		results = []
+		for prefix in [''] + self.verb_prefixes:
+			rest = self._strip_prefix(token, prefix)
+			if rest is None:
+				continue
+			for stem, verbal in self._strip_suffixes(rest):
+				if prefix and not self.ignore_declentionRules and not verbal and not self._is_verb(stem):
+					continue
+				if len(stem.replace('‌', '')) >= self.min_stem and stem not in results:
+					results.append(stem)
+		results.sort(key=len, reverse=True)
+		return results
+
+	def _strip_prefix(self, token, prefix):
+		if not prefix:
+			return token
+		if token.startswith(prefix + '‌'):
+			return token[len(prefix)+1:]
+		if self.string_matching and token.startswith(prefix) and len(token) > len(prefix):
+			return token[len(prefix):]
+		return None
+
+	def _strip_suffixes(self, word):
+		# the word itself, then one detached suffix and then one attached suffix after it
+		results = [(word, False)]
+		for suffix in self.detached_suffixes:
+			if word.endswith('‌' + suffix):
+				results.append((word[:-len(suffix)-1], False))
+			elif self.string_matching and word.endswith(suffix):
+				results.append((word[:-len(suffix)], False))
+		for stem, verbal in list(results):
+			for suffixes, is_verbal in ((self.noun_suffixes, False), (self.verb_suffixes, True)):
+				for suffix in suffixes:
+					if stem.endswith(suffix) and not stem.endswith('‌' + suffix):
+						results.append((stem[:-len(suffix)], is_verbal))
+		return [(stem.rstrip('‌'), verbal) for stem, verbal in results]
+
+	def _rules_only(self):
+		return self.ignore_lexicalLemma or not (self._keys or self._store is not None)
+
+	def _rules_lemma(self, token):
+		# without a lexicon to check stems only affixes written apart with zwnj are stripped, attached
+		# letters may be part of the stem (میوه, سیاست, ایران), and person endings only after می or نمی
+		parts = token.split('‌')
+		verbal = len(parts) > 1 and parts[0] in self.verb_prefixes
+		if verbal:
+			parts = parts[1:]
+		if len(parts) > 1 and parts[-1] in self.detached_suffixes:
+			parts = parts[:-1]
+		stem = '‌'.join(parts)
+		if verbal:
+			for suffix in self.verb_suffixes:
+				if stem.endswith(suffix) and len(stem) - len(suffix) >= self.min_stem:
+					stem = stem[:-len(suffix)]
+					break
+		return stem if len(stem) >= self.min_stem else token
+
+	def lemma(self, token):
+		if self._rules_only():
+			return self._rules_lemma(token)
+		for candidate in self.candidates(token):
+			word = self.lookup(candidate)
+			if word is not None:
+				return word
+		return token
@@ -0,0 +1,143 @@
+import re, time
+
+class NormalizerProfile():
+	"""
+		Wall time, calls and substitutions of each stage and each pattern of a PersianTextNormalizer.
+		It is attached by PersianTextNormalizer(profile=True), which replaces stage methods and compiled
+		patterns of that instance with timed ones, other instances run without any overhead.
+		With single_pass_affixes the affix rules run in one SinglePassRewriter scan and are
+		reported as one stage. Pickled copies (process executors of acleanup) are not profiled.
+
+		>>> normalizer = PersianTextNormalizer(profile=True)
+		>>> normalizer.cleanup('اصلاح نويسه ها')
+		>>> normalizer.profile.stats()['stages']['fix_suffix']['calls']
+		1
+		>>> print(normalizer.profile.prometheus())
+	"""
+
+	stages = ['fix_dashes', 'fix_three_dots', 'fix_english_quotes', 'fix_hamzeh', 'cleanup_zwnj', 'fix_english_numbers',
+		'fix_arabic_numbers', 'fix_misc_non_persian_chars', 'fix_perfix_spacing', 'fix_suffix_spacing', 'cleanup_extra_marks',
+		'cleanup_kashidas', 'fix_spacing_for_braces_and_quotes', 'cleanup_spacing', 'cleanup_begin_and_end', 'fix_suffix', 'fix_prefix']
+
+	def __init__(self):
+		self._stages = {}
+		self._patterns = {}
+
+	def attach(self, normalizer):
+		"""
+			Replaces stage methods and patterns of normalizer with timed ones that record into this profile
+		"""
+		for name in self.stages:
+			normalizer.__dict__[name] = self._timed(name, getattr(type(normalizer), name).__get__(normalizer))
+		for name in ('_fix_suffix_rewriter', '_fix_prefix_rewriter', '_fix_affix_rewriter'):
+			rewriter = normalizer.__dict__.get(name)
+			if rewriter is not None and not isinstance(rewriter, _TimedRewriter):
+				normalizer.__dict__[name] = _TimedRewriter(rewriter, self._timed(name.strip('_'), rewriter.sub))
+
+		for name, value in list(vars(normalizer).items()):
+			if isinstance(value, (_Pattern, _ProfiledPattern)):
+				normalizer.__dict__[name] = self._profiled(name, None, value)
+			elif isinstance(value, list) and value and all(isinstance(item, (_Pattern, _ProfiledPattern)) or (isinstance(item, tuple) and isinstance(item[0], (_Pattern, _ProfiledPattern))) for item in value):
+				normalizer.__dict__[name] = [self._profiled(name, i, item) if not isinstance(item, tuple) else (self._profiled(name, i, item[0]),) + item[1:] for i, item in enumerate(value)]
+
+	def detach(self, state):
+		"""
+			Returns a copy of normalizer state with its original stages and patterns, for pickling
+		"""
+		unwrap = lambda value: value.pattern_object if isinstance(value, _ProfiledPattern) else value.rewriter if isinstance(value, _TimedRewriter) else value
+		state = dict((name, unwrap(value)) for name, value in state.items() if name not in self.stages)
+		for name, value in state.items():
+			if isinstance(value, list):
+				state[name] = [unwrap(item) if not isinstance(item, tuple) else (unwrap(item[0]),) + item[1:] for item in value]
+		state['profile'] = None
+		return state
+
+	def _timed(self, name, function):
+		record = self._stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'changes': 0})
+
+		def timed(text):
+			start = time.perf_counter()
+			result = function(text)
+			record['seconds'] += time.perf_counter() - start
+			record['calls'] += 1
+			if result != text:
+				record['changes'] += 1
+			return result
+		return timed
+
+	def _profiled(self, attribute, index, pattern):
+		if isinstance(pattern, _ProfiledPattern):
+			pattern = pattern.pattern_object
+		key = (attribute.strip('_'), index)
+		record = self._patterns.setdefault(key, {'pattern': pattern.pattern, 'calls': 0, 'seconds': 0.0, 'substitutions': 0})
+		return _ProfiledPattern(pattern, record)
+
+	def reset(self):
+		for record in list(self._stages.values()) + list(self._patterns.values()):
+			for field in record:
+				if field != 'pattern':
+					record[field] = 0
+
+	def stats(self):
+		"""
+			Returns {'stages': {stage: record}, 'patterns': {'attribute[index]': record}}, records have calls,
+			seconds and changes (stages) or substitutions (patterns)
+		"""
+		return {
+			'stages': dict((name, dict(record)) for name, record in self._stages.items()),
+			'patterns': dict((name if index is None else '%s[%d]' % (name, index), dict(record)) for (name, index), record in sorted(self._patterns.items(), key=lambda item: (item[0][0], item[0][1] or 0))),
+		}
+
+	def prometheus(self, prefix='hazm_normalizer'):
+		"""
+			Returns stats in Prometheus text exposition format
+		"""
+		escape = lambda value: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+		lines = []
+		metrics = [
+			('stage_calls_total', 'Calls of each normalizer stage', self._stages, 'calls', lambda key: 'stage="%s"' % escape(key)),
+			('stage_seconds_total', 'Wall time of each normalizer stage', self._stages, 'seconds', lambda key: 'stage="%s"' % escape(key)),
+			('stage_changes_total', 'Calls of each normalizer stage that changed the text', self._stages, 'changes', lambda key: 'stage="%s"' % escape(key)),
+			('pattern_calls_total', 'Calls of each normalizer pattern', self._patterns, 'calls', None),
+			('pattern_seconds_total', 'Wall time of each normalizer pattern', self._patterns, 'seconds', None),
+			('pattern_substitutions_total', 'Substitutions made by each normalizer pattern', self._patterns, 'substitutions', None),
+		]
+		for name, help, records, field, labels in metrics:
+			lines.append('# HELP %s_%s %s' % (prefix, name, help))
+			lines.append('# TYPE %s_%s counter' % (prefix, name))
+			for key in sorted(records, key=lambda key: key if labels else (key[0], key[1] or 0)):
+				if labels is None:
+					label = 'attribute="%s",index="%s",pattern="%s"' % (escape(key[0]), '' if key[1] is None else key[1], escape(records[key]['pattern']))
+				else:
+					label = labels(key)
+				lines.append('%s_%s{%s} %s' % (prefix, name, label, repr(records[key][field])))
+		return '\n'.join(lines) + '\n'
+
+_Pattern = type(re.compile(''))
+
+class _ProfiledPattern():
+	""" compiled pattern whose sub calls are timed and counted """
+
+	def __init__(self, pattern, record):
+		self.pattern_object = pattern
+		self._record = record
+
+	def sub(self, repl, string, count=0):
+		start = time.perf_counter()
+		result, substitutions = self.pattern_object.subn(repl, string, count)
+		self._record['seconds'] += time.perf_counter() - start
+		self._record['calls'] += 1
+		self._record['substitutions'] += substitutions
+		return result
+
+	def __getattr__(self, name):
+		if name == 'pattern_object':
+			raise AttributeError(name)
+		return getattr(self.pattern_object, name)
+
+class _TimedRewriter():
+	""" SinglePassRewriter with a timed sub """
+
+	def __init__(self, rewriter, sub):
+		self.rewriter = rewriter
+		self.sub = sub
@@ -1,17 +1,61 @@
 # coding=utf8
 
 from nltk.stem.api import StemmerI
-import os, subprocess
+from hazm.LineProcess import *
+from hazm.SuffixStemmer import *
+import os
 
 class PerStemmer(StemmerI):
 	""" perstem interface """
 
 	script = os.path.dirname(__file__) + '/perstem.pl'
 
+	def __init__(self, pool_size=1, batch_size=64, native=False, cache_size=65536, exceptions=None):
+		"""
+			:param pool_size  (optionally): number of long-lived perstem processes (DEFAULT: 1)
+			:param batch_size (optionally): number of tokens written to a process before reading its output back (DEFAULT: 64)
+			:param native     (optionally): stem in process with SuffixStemmer instead of perstem.pl (DEFAULT: False)
+			:param cache_size (optionally): number of tokens memoized by the native stemmer (DEFAULT: 65536)
+			:param exceptions (optionally): words and their stems for the native stemmer, see SuffixStemmer (DEFAULT: None)
+		"""
+		self._native = SuffixStemmer(cache_size, exceptions) if native else None
+		self.pool_size = pool_size
+		self.batch_size = batch_size
+		self._pool = LineProcessPool(['perl', self.script, '--stem', '--flush', '-i', 'utf8', '-o', 'utf8'], pool_size, batch_size)
+
 	def stem(self, token):
-		perstem = subprocess.Popen(['perl', self.script, '--stem', '-i', 'utf8', '-o', 'utf8'], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
-		(data, errs) = perstem.communicate(token)
-		return data
+		if self._native:
+			return self._native.stem(token)
+		return self._pool.communicate([token])[0]
 
 	def stemText(self, text):
 		return self.stem(text)
+
+	def stem_many(self, tokens):
+		"""
+			Returns list of stems, spreading tokens over the perstem processes
+
+			>>> PerStemmer(pool_size=2).stem_many(['کتابها', 'رفتند'])
+			['کتاب', 'رف']
+		"""
+		if self._native:
+			return self._native.stem_many(tokens)
+		return self._pool.communicate(tokens)
+
+	def close(self):
+		"""
+			Stops all perstem processes, they will be started again on next call
+		"""
+		self._pool.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+	def __del__(self):
+		try:
+			self.close()
+		except Exception:
+			pass
@@ -0,0 +1,170 @@
+from nltk.tag.api import TaggerI
+from nltk.tag import str2tuple
+import numpy as np
+import random, zlib
+
+class PerceptronPOSTagger(TaggerI):
+	"""
+		A greedy averaged perceptron pos tagger that runs in process, without the Stanford jar.
+		Features are hashed with crc32 into 2 ** n_bits rows, and only rows of features that fire
+		in training are stored: a sorted array of their hashes and a (rows, tags) weight matrix.
+		Training memory is about 16 bytes per fired row and tag (weights, totals and stamps),
+		not per possible row, and the model saves to a single compressed file.
+
+		>>> tagger = PerceptronPOSTagger()
+		>>> tagger.train(BijankhanReader.tagged_sents())
+		>>> tagger.save('data/persian-perceptron.npz')
+		>>> PerceptronPOSTagger('data/persian-perceptron.npz').tag(['من', 'به', 'مدرسه', 'رفتم'])
+	"""
+
+	_SEPARATOR = '/'
+
+	def __init__(self, model=None, n_bits=18):
+		"""
+			:param model  (optionally): model file saved by save()
+			:param n_bits (optionally): number of hashed feature rows is 2 ** n_bits (DEFAULT: 18)
+		"""
+		self.n_bits = n_bits
+		self.tags = []
+		self._rows = None
+		self._weights = None
+		if model is not None:
+			self.load(model)
+
+	def _features(self, i, words, prev, prev2):
+		word = words[i]
+		prev_word = words[i-1] if i > 0 else '-START-'
+		next_word = words[i+1] if i + 1 < len(words) else '-END-'
+		features = (
+			'b',
+			'w ' + word,
+			's ' + word[-3:],
+			'p ' + word[:1],
+			't ' + prev,
+			'tt ' + prev + ' ' + prev2,
+			'tw ' + prev + ' ' + word,
+			'pw ' + prev_word,
+			'ps ' + prev_word[-3:],
+			'nw ' + next_word,
+			'ns ' + next_word[-3:],
+		)
+		mask = (1 << self.n_bits) - 1
+		return np.array(sorted(set(zlib.crc32(feature.encode('utf-8')) & mask for feature in features)), dtype=np.int64)
+
+	def train(self, tagged_sents, iterations=5, seed=0):
+		"""
+			Trains on lists of (word, tag), e.g. BijankhanReader.tagged_sents()
+			:param iterations (optionally): passes over the shuffled training data (DEFAULT: 5)
+		"""
+		sentences = [list(sentence) for sentence in tagged_sents]
+		self.tags = sorted(set(tag for sentence in sentences for word, tag in sentence))
+		tag_ids = dict((tag, t) for t, tag in enumerate(self.tags))
+
+		# compact row of each hashed feature, in order of first firing; arrays grow by doubling
+		index = {}
+		capacity = 1024
+		weights = np.zeros((capacity, len(self.tags)), dtype=np.int32)
+		# sums of each weight over all updates and the step each weight was last changed,
+		# so averaging only touches updated weights
+		totals = np.zeros((capacity, len(self.tags)), dtype=np.int64)
+		stamps = np.zeros((capacity, len(self.tags)), dtype=np.int32)
+
+		step = 0
+		shuffle = random.Random(seed).shuffle
+		for iteration in range(iterations):
+			shuffle(sentences)
+			for sentence in sentences:
+				words = [word for word, tag in sentence]
+				prev, prev2 = '-START-', '-START2-'
+				for i, (word, tag) in enumerate(sentence):
+					step += 1
+					features = np.array([index.setdefault(row, len(index)) for row in self._features(i, words, prev, prev2).tolist()], dtype=np.int64)
+					if len(index) > capacity:
+						capacity *= 2
+						weights, totals, stamps = [np.concatenate([array, np.zeros_like(array)]) for array in (weights, totals, stamps)]
+					guess = int(weights[features].sum(axis=0).argmax())
+					truth = tag_ids[tag]
+					if guess != truth:
+						for t, delta in ((truth, 1), (guess, -1)):
+							totals[features, t] += (step - stamps[features, t]).astype(np.int64) * weights[features, t]
+							stamps[features, t] = step
+							weights[features, t] += delta
+					prev, prev2 = self.tags[guess], prev
+
+		used = len(index)
+		totals = totals[:used] + (step - stamps[:used]).astype(np.int64) * weights[:used]
+		rows = np.fromiter(index, dtype=np.int64, count=used)
+		order = np.argsort(rows)
+		self._rows = rows[order]
+		self._weights = (totals[order] / max(step, 1)).astype(np.float32)
+
+	def _lookup(self, features):
+		# compact rows of hashed features, features that never fired in training are dropped
+		positions = np.searchsorted(self._rows, features)
+		found = positions < len(self._rows)
+		found[found] = self._rows[positions[found]] == features[found]
+		return positions[found]
+
+	def save(self, model):
+		np.savez_compressed(model, rows=self._rows, weights=self._weights, tags=np.array(self.tags), n_bits=self.n_bits)
+
+	def load(self, model):
+		data = np.load(model)
+		self._rows = data['rows']
+		self._weights = data['weights']
+		self.tags = [str(tag) for tag in data['tags']]
+		self.n_bits = int(data['n_bits'])
+
+	def tag(self, tokens):
+		words = list(tokens)
+		prev, prev2 = '-START-', '-START2-'
+		tagged = []
+		for i, word in enumerate(words):
+			tag = self.tags[int(self._weights[self._lookup(self._features(i, words, prev, prev2))].sum(axis=0).argmax())]
+			tagged.append((word, tag))
+			prev, prev2 = tag, prev
+		return tagged
+
+	def batch_tag(self, sentences):
+		return [self.tag(sentence) for sentence in sentences]
+
+	def tag_sents(self, sentences):
+		return self.batch_tag(sentences)
+
+	def evaluate(self, gold):
+		"""
+			Returns accuracy on lists of (word, tag)
+		"""
+		correct = total = 0
+		for sentence in gold:
+			tagged = self.tag([word for word, tag in sentence])
+			correct += sum(1 for (word, tag), (w, guess) in zip(sentence, tagged) if tag == guess)
+			total += len(sentence)
+		return float(correct) / total if total else 0.0
+
+	def evaluate_sents(self, gold_sents):
+		return self.evaluate(gold_sents)
+
+	def evaluate_file(self, gold_file):
+		"""
+			>>> tagger.evaluate_file('data/bijankhan-test.txt')
+		"""
+		corpus = []
+		for sent in open(gold_file, encoding='utf-8'):
+			corpus.append([str2tuple(t, self._SEPARATOR) for t in sent.split()])
+		return self.evaluate(corpus)
+
+if __name__ == '__main__':
+	from hazm import BijankhanReader
+	import time
+
+	train, test = BijankhanReader.split_train_test(test_size=0.1)
+	to_tuples = lambda sents: [[str2tuple(t) for t in sent.split()] for sent in sents]
+	tagger = PerceptronPOSTagger()
+	tagger.train(to_tuples(train))
+	tagger.save('data/persian-perceptron.npz')
+
+	test = to_tuples(test)
+	start = time.time()
+	accuracy = tagger.evaluate(test)
+	print('accuracy: %.4f, %d tokens/s' % (accuracy, sum(len(sent) for sent in test) / (time.time() - start)))
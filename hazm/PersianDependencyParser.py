@@ -1,21 +1,47 @@
 
 from nltk.parse.malt import MaltParser
-from PersianPOSTagger import *
+from hazm.PersianPOSTagger import *
 from nltk.data import ZipFilePathPointer
+from nltk.parse.dependencygraph import DependencyGraph
+from hazm.LineProcess import *
 from hazm.PersianTokenizer import *
 from hazm.PersianTextNormalizer import *
-import os
+from hazm.Pipeline import *
+import os, io, subprocess, threading
 
 class PersianDependencyParser(MaltParser):
+	"""
+		With server=True the trained model stays loaded in MaltServer.java processes and sentences
+		are streamed to them, instead of starting a JVM and loading the .mco file on each parse call.
+		Server mode needs java 11 or newer, to run the source file without compiling it.
 
-	def __init__(self, tagger=None, mco=None, working_dir="data/parse", path_to_malt="resources"):
+		>>> parser = PersianDependencyParser(mco='persian', server=True)
+		>>> graph = parser.raw_parse('من به مدرسه رفتم')
+		>>> parser.close()
+	"""
+
+	server_script = os.path.dirname(__file__) + '/MaltServer.java'
+
+	def __init__(self, tagger=None, mco=None, working_dir="data/parse", path_to_malt="resources", server=False, instances=1, batch_size=64, timeout=60):
+		"""
+			:param server (optionally): keep parser processes with the loaded model running (DEFAULT: False)
+			:param instances (optionally): number of parser processes in server mode (DEFAULT: 1)
+			:param batch_size (optionally): sentences written to a process before reading its output (DEFAULT: 64)
+			:param timeout (optionally): seconds to wait for a parsed line before restarting the process (DEFAULT: 60)
+		"""
 		os.environ["MALTPARSERHOME"] = path_to_malt
 		self._tokenizer = PersianTokenizer()
-		self._normalizer = PersianTextNormalizer()
+		self._normalizer = PersianTextNormalizer(single_pass_affixes=True)
+		self._pipeline = Pipeline(self._normalizer, self._tokenizer)
 		if tagger is None:
 			tagger = PersianPOSTagger('data/persian.tagger')
 		super(PersianDependencyParser, self).__init__(tagger, mco, working_dir)
 
+		self._server = None
+		if (server == True):
+			cmd = ['java', '-cp', self._malt_bin, self.server_script, self.mco, self.working_dir]
+			self._server = LineProcessPool(cmd, instances, batch_size, timeout=timeout)
+
 	def raw_parse(self, sentence, verbose=False):
 		"""
 		Use MaltParser to parse a sentence. Takes a sentence as a string;
@@ -31,38 +57,157 @@ class PersianDependencyParser(MaltParser):
 			words = self._tokenizer.word_tokenize(sent)
 			return self.parse(words, verbose)
 
+	def raw_parse_sents(self, text, verbose=False):
+		"""
+		Use MaltParser to parse all sentences of a text. The text is normalized, split
+		into sentences, tokenized and tagged as one batch, and all sentences go to a
+		single MaltParser run.
+
+		:param text: Input text to parse
+		:type text: str
+		:return: generator of ``DependencyGraph`` of each sentence
+		"""
+		return self.parse_sents(self._pipeline.sents(text), verbose)
+
+	def parse_sents(self, sentences, verbose=False):
+		"""
+		Use MaltParser to parse tokenized sentences with one tagger call and one MaltParser run.
+
+		:param sentences: Input sentences to parse
+		:type sentences: list(list(str))
+		:return: generator of ``DependencyGraph`` of each non-empty sentence
+		"""
+		sentences = [[word for word in sentence if word] for sentence in sentences]
+		sentences = [sentence for sentence in sentences if sentence]
+		if not sentences:
+			return iter([])
+		tagged_sentences = self.tagger.batch_tag(sentences)
+		return iter(self.tagged_batch_parse(tagged_sentences, verbose))
+
+	def _server_parse(self, sentences):
+		sentences = [list(sentence) for sentence in sentences]
+		lines = self._server.communicate(['\t'.join(word + '\t' + tag for word, tag in sentence) for sentence in sentences])
+		graphs = []
+		for sentence, line in zip(sentences, lines):
+			arcs = line.split('\t')
+			if not line or len(arcs) != 2 * len(sentence):
+				raise Exception("MaltParser could not parse: %s" % ' '.join(word for word, tag in sentence))
+			conll = ['%d\t%s\t_\t%s\t%s\t_\t%s\t%s\t_\t_' % (i + 1, word, tag, tag, arcs[2*i], arcs[2*i+1]) for i, (word, tag) in enumerate(sentence)]
+			graphs.append(DependencyGraph('\n'.join(conll)))
+		return graphs
+
+	def close(self):
+		"""
+			Stops parser processes of server mode, they will be started again on next call
+		"""
+		if self._server is not None:
+			self._server.close()
+
+	def tagged_batch_parse(self, sentences, verbose=False):
+		if self._server is None:
+			return list(self._stream_parse(sentences, verbose))
+		return self._server_parse(sentences)
+
+	def tagged_parse_sents(self, sentences, verbose=False):
+		if self._server is None:
+			return list(self._stream_parse(sentences, verbose))
+		return self._server_parse(sentences)
+
+	def _stream_parse(self, sentences, verbose=False):
+		"""
+			Pipes tagged sentences to MaltParser as CoNLL and yields each graph as it is read back,
+			no input or output file is written
+		"""
+		if not self._malt_bin:
+			raise Exception("MaltParser location is not configured. Call config_malt() first.")
+
+		cmd = ['java', '-jar', self._malt_bin, '-w', self.working_dir,
+			   '-c', self.mco, '-i', '/dev/stdin', '-o', '/dev/stdout', '-lfi', 'stderr', '-m', 'parse']
+		process = self._start(cmd, conll_lines(sentences), stdout=subprocess.PIPE, verbose=verbose)
+
+		rows = []
+		for line in io.TextIOWrapper(process.stdout, encoding='utf-8'):
+			line = line.rstrip('\r\n')
+			if line:
+				rows.append(line)
+			elif rows:
+				yield DependencyGraph('\n'.join(rows))
+				rows = []
+		if rows:
+			yield DependencyGraph('\n'.join(rows))
+
+		ret = process.wait()
+		if ret != 0:
+			raise Exception("MaltParser parsing (%s) failed with exit code %d" % (' '.join(cmd), ret))
+
+	def _start(self, cmd, source, stdout=None, verbose=False):
+		# source is written to stdin from a thread, so reading stdout can not block on it
+		output = None if verbose else subprocess.DEVNULL
+		process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=stdout or output, stderr=output)
+
+		def feed():
+			try:
+				if hasattr(source, 'read'):
+					while True:
+						chunk = source.read(1 << 16)
+						if not chunk:
+							break
+						process.stdin.write(chunk if isinstance(chunk, bytes) else chunk.encode('utf-8'))
+				else:
+					for line in source:
+						process.stdin.write((line + '\n').encode('utf-8'))
+			except IOError:
+				pass
+			finally:
+				try:
+					process.stdin.close()
+				except IOError:
+					pass
+
+		thread = threading.Thread(target=feed)
+		thread.daemon = True
+		thread.start()
+		return process
+
+	def train(self, depgraphs, verbose=False, option_file='data/parse/optionsFile.xml', guide_file='data/parse/guideFile.xml', xms='-Xms1g', xmx='-Xmx2g'):
+		"""
+		Train MaltParser from ``DependencyGraph`` objects, they are streamed to MaltParser one at a time.
+		The signature of MaltParser.train is kept, options of train_from_file are keyword arguments.
+
+		>>> parser.train(graphs, option_file='data/parse/optionsFile.xml', guide_file='data/parse/guideFile.xml')
+		"""
+		self.train_from_file((graph.to_conll(10) for graph in depgraphs), option_file, guide_file, xms, xmx, verbose)
+
 	def train_from_file(self, conll_file, option_file, guide_file, xms='-Xms1g', xmx='-Xmx2g', verbose=False):
 		"""
-		Train MaltParser from a file
+		Train MaltParser from a file. A path is given to MaltParser as is, and a ZipFilePathPointer,
+		open file or iterable of CoNLL lines is piped to its stdin, without a temporary copy.
 
-		:param conll_file: str for the filename of the training input data
+		:param conll_file: filename, ZipFilePathPointer, file object or lines of the training input data
 		:param option_file: str for the filename of the option file
 		:param guide_file: str for the filename of the guide file for specifying the feature model specification file
 		"""
 		if not self._malt_bin:
 			raise Exception("MaltParser location is not configured. Call config_malt() first.")
 
-		# If conll_file is a ZipFilePathPointer, then we need to do some extra
-		# massaging
+		source = None
 		if isinstance(conll_file, ZipFilePathPointer):
-			input_file = tempfile.NamedTemporaryFile(prefix='malt_train.conll',
-													 dir=self.working_dir,
-													 delete=False)
-			try:
-				conll_str = conll_file.open().read()
-				conll_file.close()
-				input_file.write(conll_str)
-				input_file.close()
-				return self.train_from_file(input_file.name, verbose=verbose)
-			finally:
-				input_file.close()
-				os.remove(input_file.name)
+			source = conll_file.open()
+		elif not isinstance(conll_file, str):
+			source = conll_file
 
 		cmd = ['java', xms, xmx, '-jar', self._malt_bin, '-w', self.working_dir,
-			   '-c', self.mco, '-i', conll_file, '-f', option_file,
+			   '-c', self.mco, '-i', conll_file if source is None else '/dev/stdin', '-f', option_file,
 			   '-F', guide_file, '-m', 'learn']
 
-		ret = self._execute(cmd, verbose)
+		if source is None:
+			ret = self._execute(cmd, verbose)
+		else:
+			try:
+				ret = self._start(cmd, source, verbose=verbose).wait()
+			finally:
+				if hasattr(source, 'close'):
+					source.close()
 		if ret != 0:
 			raise Exception("MaltParser training (%s) "
 							"failed with exit code %d" %
@@ -70,9 +215,33 @@ class PersianDependencyParser(MaltParser):
 
 		self._trained = True
 
+def conll_lines(sentences):
+	"""
+		Yields CoNLL lines of tagged sentences, with an empty line after each sentence
+
+		>>> list(conll_lines([[('من', 'PR'), ('رفتم', 'V')]]))
+		['1\tمن\t_\tPR\tPR\t_\t0\ta\t_\t_', '2\tرفتم\t_\tV\tV\t_\t0\ta\t_\t_', '']
+	"""
+	for sentence in sentences:
+		for i, (word, tag) in enumerate(sentence):
+			yield '%d\t%s\t_\t%s\t%s\t_\t0\ta\t_\t_' % (i + 1, word, tag, tag)
+		yield ''
+
 if __name__ == '__main__':
 	parser = PersianDependencyParser(mco="persian")
 	parser.train_from_file('data/dadegan/dependency.conll', 'data/parse/optionsFile.xml', 'data/parse/guideFile.xml', verbose=True)
 	txt = "This is a test sentence"
 	graph = parser.raw_parse(txt)
-	graph.tree().pprint()
\ No newline at end of file
+	graph.tree().pprint()
+	for graph in parser.raw_parse_sents(txt):
+		graph.tree().pprint()
+
+	# latency of server mode, after the model is loaded by the first call
+	import time
+	server = PersianDependencyParser(mco="persian", server=True)
+	server.raw_parse(txt)
+	start = time.time()
+	for i in range(100):
+		server.raw_parse(txt)
+	print('server mode: %.1f ms per sentence' % ((time.time() - start) * 10))
+	server.close()
\ No newline at end of file
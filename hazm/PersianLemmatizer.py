@@ -0,0 +1,49 @@
+# coding=utf8
+
+from functools import lru_cache
+import importlib
+
+# name: (module, class) of lemmatizer backends, a backend has lemma(token) and takes options as keyword arguments
+backends = {
+	'native': ('hazm.NativeLemmatizer', 'NativeLemmatizer'),
+	'virastyar': ('hazm.virastyar', 'VirastyarPersianLemmatizer'),
+}
+
+def register_backend(name, backend):
+	"""
+		Adds a backend, a class or (module, class) names that are imported on first use
+
+		>>> register_backend('mine', MyLemmatizer)
+		>>> PersianLemmatizer(backend='mine')
+	"""
+	backends[name] = backend
+
+class PersianLemmatizer():
+	"""
+		Lemmatizer with a selectable backend and memoized results. The native backend runs
+		Virastyar rules in python, the virastyar backend needs IronPython and Virastyar DLLs.
+
+		>>> PersianLemmatizer(lexicon=None).lemma('می‌خورم')
+		'خور'
+		>>> PersianLemmatizer(backend='virastyar', phonetic_comparison=False).lemma('دانام')
+	"""
+
+	def __init__(self, backend='native', cache_size=65536, **options):
+		"""
+			:param backend (optionally): name of a registered backend (DEFAULT: native)
+			:param cache_size (optionally): number of memoized tokens, None for unbounded (DEFAULT: 65536)
+			:param options: string_matching, phonetic_comparison, ignore_lexicalLemma, ignore_declentionRules and backend specific options
+		"""
+		if backend not in backends:
+			raise Exception("Unknown lemmatizer backend '%s', registered backends are: %s" % (backend, ', '.join(sorted(backends))))
+		factory = backends[backend]
+		if isinstance(factory, tuple):
+			factory = getattr(importlib.import_module(factory[0]), factory[1])
+		self.backend = factory(**options)
+		self._cached_lemma = lru_cache(maxsize=cache_size)(self.backend.lemma)
+
+	def lemma(self, token):
+		return self._cached_lemma(token)
+
+	def lemmas(self, tokens):
+		return [self.lemma(token) for token in tokens]
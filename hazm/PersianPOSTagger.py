@@ -1,6 +1,8 @@
 from nltk.tag.stanford import POSTagger
 from nltk.tag import str2tuple
-import subprocess
+from hazm.LineProcess import *
+from hazm.TrainingJob import *
+import threading
 
 class PersianPOSTagger(POSTagger):
 	"""
@@ -9,6 +11,15 @@ class PersianPOSTagger(POSTagger):
 		 - (optionally) the path to the stanford tagger jar file. If not specified here,
        then this jar file must be specified in the CLASSPATH envinroment variable.
          - (optionally) the encoding of the training data (default: UTF8)
+         - (optionally) server=True keeps tagger processes with the loaded model running and streams
+       sentences to them, instead of starting a JVM on each tag/batch_tag call (default: False)
+         - (optionally) instances, the number of tagger processes in server mode (default: 1)
+         - (optionally) batch_size, sentences written to a process before reading its output (default: 64)
+         - (optionally) timeout, seconds to wait for a tagged line before restarting the process (default: 60)
+
+		>>> st = PersianPOSTagger('data/persian.tagger', server=True, instances=2)
+		>>> tagged = st.batch_tag([['من', 'به', 'مدرسه', 'رفتم']])
+		>>> st.close()
 	"""
 
 	_SEPARATOR = '/'
@@ -16,6 +27,11 @@ class PersianPOSTagger(POSTagger):
 	bijankhan_path = 'data/bijankhan.txt'
 
 	def __init__(self, *args, **kwargs):
+		server = kwargs.pop('server', False)
+		instances = kwargs.pop('instances', 1)
+		batch_size = kwargs.pop('batch_size', 64)
+		timeout = kwargs.pop('timeout', 60)
+
 		lst = list(args)
 		args_count = len(args)
 		if (args_count >= 2):
@@ -31,10 +47,48 @@ class PersianPOSTagger(POSTagger):
 
 		super(PersianPOSTagger, self).__init__(*args, **kwargs)		
 
+		self._server = None
+		if (server == True):
+			cmd = ['java'] + self.java_options.split() + ['-classpath', self._stanford_jar, 'edu.stanford.nlp.tagger.maxent.MaxentTagger',
+                   '-model', self._stanford_model,
+                   '-tokenize', 'false',
+                   '-sentenceDelimiter', 'newline',
+                   '-outputFormat', 'slashTags',
+                   '-tagSeparator', self._SEPARATOR,
+                   '-encoding', 'utf8']
+			self._server = LineProcessPool(cmd, instances, batch_size, timeout=timeout)
+
+	def batch_tag(self, sentences):
+		if self._server is None:
+			return super(PersianPOSTagger, self).batch_tag(sentences)
+		return self._server_tag(sentences)
+
+	def tag_sents(self, sentences):
+		if self._server is None:
+			return super(PersianPOSTagger, self).tag_sents(sentences)
+		return self._server_tag(sentences)
+
+	def _server_tag(self, sentences):
+		sentences = [list(sentence) for sentence in sentences]
+		lines = self._server.communicate([' '.join(sentence) for sentence in sentences])
+		return [[tuple(token.rsplit(self._SEPARATOR, 1)) for token in line.split()] for line in lines]
+
+	def close(self):
+		"""
+			Stops tagger processes of server mode, they will be started again on next call
+		"""
+		if self._server is not None:
+			self._server.close()
+
 	@staticmethod
-	def train(train_file, properties, model, xms='-Xms1g', xmx='-Xmx2g', verbose=True):
+	def train(train_file, properties, model, xms='-Xms1g', xmx='-Xmx2g', verbose=True, limiter=None):
 		"""
-			>>> PersianPOSTagger.train('data/bijankhan-train.txt','data/persian-left3words-distsim.tagger.props', 'data/persian.mco')
+			Starts training in background and returns its TrainingJob, which supports wait(), poll(),
+			lines() for streamed log and elapsed/peak_rss stats
+
+			>>> job = PersianPOSTagger.train('data/bijankhan-train.txt','data/persian-left3words-distsim.tagger.props', 'data/persian.mco')
+			>>> job.wait()
+			0
 		"""
 		#	def train(self, train_file, properties, model, xms='-Xms120m', xmx='-Xmx1g'):
 		#		cmd = ['java', xms, xmx, '-classpath', self._path_to_jar, 'edu.stanford.nlp.tagger.maxent.MaxentTagger',
@@ -44,11 +98,21 @@ class PersianPOSTagger(POSTagger):
                    '-model', model, 
                    '-trainFile', train_file,
                    '-tagSeparator', '/']
-		output=subprocess.PIPE
-		if (verbose == True):
-			p = subprocess.Popen(cmd)
-		else:
-			p = subprocess.Popen(cmd, stdout=output, stderr=output)
+		return TrainingJob(cmd, verbose, limiter)
+
+	@staticmethod
+	def train_many(configs, max_workers=2, verbose=False):
+		"""
+			Starts a training job for each config (dict of train arguments), running at most max_workers at a time
+
+			>>> jobs = PersianPOSTagger.train_many([
+			...     {'train_file': 'data/bijankhan-train.txt', 'properties': 'data/left3words.props', 'model': 'data/left3words.tagger'},
+			...     {'train_file': 'data/bijankhan-train.txt', 'properties': 'data/bidirectional.props', 'model': 'data/bidirectional.tagger', 'xmx': '-Xmx4g'}])
+			>>> [job.wait() for job in jobs]
+			[0, 0]
+		"""
+		limiter = threading.BoundedSemaphore(max_workers)
+		return [PersianPOSTagger.train(verbose=verbose, limiter=limiter, **config) for config in configs]
 
 	def evaluate_file(self, gold_file):
 		corpus = []
@@ -58,7 +122,16 @@ class PersianPOSTagger(POSTagger):
 			corpus.append([tag_convert(str2tuple(t)) for t in sent.split()])
 		return super(PersianPOSTagger, self).evaluate(corpus)
 
+	def evaluate_sents(self, gold_sents):
+		"""
+			Evaluates on lists of (word, tag) tuples, such as BijankhanReader.tagged_sents(),
+			without writing and re-parsing a gold file
+
+			>>> st.evaluate_sents(BijankhanReader.tagged_sents())
+		"""
+		return super(PersianPOSTagger, self).evaluate(list(gold_sents))
+
 if __name__ == '__main__':
-	PersianPOSTagger.train('data/bijankhan-train.txt','data/persian-left3words-distsim.tagger.props', 'data/persian.tagger')
+	PersianPOSTagger.train('data/bijankhan-train.txt','data/persian-left3words-distsim.tagger.props', 'data/persian.tagger').wait()
 	st = PersianPOSTagger('data/persian.tagger')
 	st.evaluate_file('data/bijankhan-test.txt')
\ No newline at end of file
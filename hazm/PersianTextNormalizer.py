@@ -1,4 +1,7 @@
-import re
+import re, copy, functools
+from hazm.SinglePassRewriter import *
+from hazm.BatchCoalescer import *
+from hazm.NormalizerProfile import *
 
 class PersianTextNormalizer():
 	# The PersianTextNormalizer class contains a python version of the original 
@@ -26,7 +29,23 @@ class PersianTextNormalizer():
 						cleanup_spacing=True,
 						cleanup_begin_and_end=True,
 						fix_suffix=True,
-						fix_prefix=True):
+						fix_prefix=True,
+						single_pass_affixes=False,
+						protect=('urls',),
+						profile=False):
+		# spans that are kept as they are, names of protected_patterns or regular expressions
+		self._protect = protect
+		self._protect_pattern = None
+		if (protect):
+			self._protect_pattern = re.compile('|'.join('(?:' + self.protected_patterns.get(name, name) + ')' for name in protect))
+
+		self._english_numbers_table = str.maketrans(self.english_numbers, self.persian_numbers)
+		self._arabic_numbers_table = str.maketrans(self.arabic_numbers, self.persian_numbers)
+		self._misc_non_persian_chars_table = str.maketrans(self.bad_chars, self.good_chars)
+		self._sentinel = None
+		self._batch_normalizer = None
+		self._coalescer = None
+
 		self._fix_dashes = fix_dashes
 		self._fix_dashes_pattern = [
 			( re.compile('-{3}', flags=re.DOTALL), '—' ),
@@ -239,15 +258,26 @@ class PersianTextNormalizer():
 			re.compile(r'\s+(سوأ)\s+', flags=re.DOTALL)
 		]
 
+		# opt-in: apply fix_suffix and fix_prefix rules in one scan instead of one re.sub per rule
+		self._single_pass_affixes = single_pass_affixes
+		if (self._single_pass_affixes):
+			prefix_rules = [(pattern, r'‌ \1‌') for pattern in self._fix_prefix_pattern]
+			self._fix_suffix_rewriter = SinglePassRewriter(self._fix_suffix_pattern)
+			self._fix_prefix_rewriter = SinglePassRewriter(prefix_rules)
+			self._fix_affix_rewriter = SinglePassRewriter(self._fix_suffix_pattern + prefix_rules)
+
+		# opt-in: time each stage and pattern of this instance into self.profile, see NormalizerProfile
+		self.profile = None
+		if (profile):
+			self.profile = NormalizerProfile()
+			self.profile.attach(self)
+
 	def cleanup(self, text):
-		# removing URLS bringing them back at the end of process
-		urls = []
-		pattern = r'https?:\/\/([-\w\.]+)+(:\d+)?(\/([\w\/_\.]*(\?\S+)?)?)?'
-		iterator = re.finditer(pattern, text)
-		for i, match in enumerate(iterator):
-			urls.append(match.group(0))
-			text = text.replace(match.group(0), "__urls__" + str(i) + "__", 1)
-		
+		# replacing protected spans (urls, ...) with placeholders and bringing them back at the end of process
+		protected = []
+		if (self._protect_pattern):
+			text = self._protect_pattern.sub(lambda match: self._placeholder(protected, match.group(0)), text)
+
 		if (self._fix_dashes):
 			text = self.fix_dashes(text)
 		if (self._fix_three_dots):
@@ -265,13 +295,6 @@ class PersianTextNormalizer():
 		if (self._fix_misc_non_persian_chars):
 			text = self.fix_misc_non_persian_chars(text)
 
-		# should not replace exnglish chars in english phrases
-		pattern = r'([a-zA-Z\-_]{2,}[۰-۹]+|[۰-۹]+[a-zA-Z\-_]{2,})'
-		iterator = re.finditer(pattern, text, flags=re.IGNORECASE)
-		for match in iterator:
-			new_text = match.group(0).translate(str.maketrans(self.persian_numbers, self.english_numbers))
-			text.replace(match.group(0), new_text, 1)
-
 		if (self._fix_perfix_spacing):
 			text = self.fix_perfix_spacing(text)
 		if (self._fix_suffix_spacing):
@@ -288,21 +311,118 @@ class PersianTextNormalizer():
 			text = self.cleanup_spacing(text)
 		if (self._cleanup_begin_and_end):
 			text = self.cleanup_begin_and_end(text)
-		if (self._fix_suffix):
-			text = self.fix_suffix(text)
-		if (self._fix_prefix):
-			text = self.fix_prefix(text)
-
-		# bringing back urls
-		pattern = r'__urls__\d+__'
-		iterator = re.finditer(pattern, text)
-		for match in iterator:
-			parts = match.group(0).split("__")
-			index = int(parts[len(parts)-2])
-			text = text.replace(match.group(0), urls[index], 1)
+		if (self._single_pass_affixes and self._fix_suffix and self._fix_prefix):
+			text = self._fix_affix_rewriter.sub(text)
+		else:
+			if (self._fix_suffix):
+				text = self.fix_suffix(text)
+			if (self._fix_prefix):
+				text = self.fix_prefix(text)
+
+		if (protected):
+			text = self._placeholder_pattern.sub(lambda match: protected[int(match.group(1).translate(self._placeholder_digits))], text)
 
 		return text
 
+	protected_patterns = {
+		'urls': r'https?:\/\/([-\w\.]+)+(:\d+)?(\/([\w\/_\.]*(\?\S+)?)?)?',
+		'emails': r'[\w\.\+\-]+@[\w\-]+(\.[\w\-]+)+',
+		'hashtags': r'#\w+',
+		'mentions': r'@\w+',
+		# should not replace english numbers in english phrases
+		'latin_numbers': r'[a-zA-Z\-_]{2,}[0-9]+|[0-9]+[a-zA-Z\-_]{2,}',
+	}
+
+	# placeholders are private use characters that no rule changes: start, index digits, end
+	_placeholder_pattern = re.compile('\ue001([\ue010-\ue019]+)\ue002')
+	_placeholder_digits = dict((0xe010 + i, str(i)) for i in range(10))
+
+	def _placeholder(self, protected, span):
+		protected.append(span)
+		return '\ue001' + ''.join(chr(0xe010 + int(digit)) for digit in str(len(protected) - 1)) + '\ue002'
+
+	def cleanup_batch(self, texts, chunk_size=1000):
+		"""
+			Yields cleanup of each text. Texts are joined by a sentinel character in chunks of
+			chunk_size, so each rule runs once per chunk instead of once per text.
+
+			>>> list(PersianTextNormalizer().cleanup_batch(['اصلاح نويسه ها', 'رحــــــيم']))
+			['اصلاح نویسه ها', 'رحیم']
+		"""
+		chunk = []
+		for text in texts:
+			chunk.append(text)
+			if len(chunk) >= chunk_size:
+				for text in self._cleanup_chunk(chunk):
+					yield text
+				chunk = []
+		for text in self._cleanup_chunk(chunk):
+			yield text
+
+	def async_executor(self, executor=None, batch_size=64, delay=0.002):
+		"""
+			Sets how acleanup runs, e.g. a ProcessPoolExecutor to use more cores (DEFAULT: one thread)
+			:param batch_size (optionally): maximum texts cleaned up together (DEFAULT: 64)
+			:param delay      (optionally): maximum seconds a text waits for others to join its batch (DEFAULT: 0.002)
+		"""
+		self._coalescer = BatchCoalescer(functools.partial(batch_method, self, 'cleanup_batch'), executor, batch_size, delay)
+
+	async def acleanup(self, text):
+		"""
+			cleanup for asyncio, concurrent calls are coalesced into cleanup_batch calls in the executor
+
+			>>> await normalizer.acleanup('اصلاح نويسه ها')
+		"""
+		if self._coalescer is None:
+			with coalescer_lock:
+				if self._coalescer is None:
+					self.async_executor()
+		return await self._coalescer.submit(text)
+
+	def __getstate__(self):
+		# the coalescer holds its executor, process executors get the rules only
+		state = self.__dict__.copy()
+		state['_coalescer'] = None
+		if (self.profile):
+			state = self.profile.detach(state)
+		return state
+
+	_batch_sentinel = '\ue000'
+
+	def _cleanup_chunk(self, texts):
+		sentinel = self._batch_sentinel
+		if not texts:
+			return []
+		if any(sentinel in text for text in texts):
+			return [self.cleanup(text) for text in texts]
+
+		if self._batch_normalizer is None:
+			self._batch_normalizer = self._sentinel_copy()
+		return self._batch_normalizer.cleanup(sentinel.join(texts)).split(sentinel)
+
+	def _sentinel_copy(self):
+		# a copy whose patterns can not match across the sentinel, by leaving it out of
+		# negated classes, dots and \S, so each text in a chunk is cleaned up on its own
+		sentinel = self._batch_sentinel
+
+		def exclude(pattern):
+			source = pattern.pattern.replace('[^', '[^' + sentinel).replace('(.+?)', '([^' + sentinel + ']+?)').replace(r'\S', r'[^\s' + sentinel + ']')
+			return re.compile(source, pattern.flags)
+
+		normalizer = copy.copy(self)
+		normalizer._sentinel = sentinel
+		normalizer._sentinel_spaces = re.compile(r'\s*' + sentinel + r'\s*')
+		if (self._protect_pattern):
+			normalizer._protect_pattern = exclude(self._protect_pattern)
+		normalizer._fix_english_quotes_ppattern = exclude(self._fix_english_quotes_ppattern)
+		normalizer._fix_hamzeh_pattern = exclude(self._fix_hamzeh_pattern)
+		normalizer._fix_spacing_for_braces_and_quotes_pattern = [(exclude(pattern), rep) for pattern, rep in self._fix_spacing_for_braces_and_quotes_pattern]
+		if (self.profile):
+			# copy.copy goes through __getstate__, which left out the profile
+			normalizer.profile = self.profile
+			self.profile.attach(normalizer)
+		return normalizer
+
 	persian_numbers = "۱۲۳۴۵۶۷۸۹۰"
 	arabic_numbers  = "١٢٣٤٥٦٧٨٩٠"
 	english_numbers = "1234567890"
@@ -359,14 +479,14 @@ class PersianTextNormalizer():
 			>>> fix_english_numbers('1234-۱۲۳۴-١٢٣٤')
 			'۱۲۳۴-۱۲۳۴-١٢٣٤'
 		"""
-		return text.translate(str.maketrans(self.english_numbers, self.persian_numbers))
+		return text.translate(self._english_numbers_table)
 
 	def fix_arabic_numbers(self, text):
 		"""
 			>>> fix_arabic_numbers('1234-۱۲۳۴-١٢٣٤')
 			'1234-۱۲۳۴-۱۲۳۴'
 		"""
-		return text.translate(str.maketrans(self.arabic_numbers, self.persian_numbers))
+		return text.translate(self._arabic_numbers_table)
 		# python 2
 		#	from string import maketrans
 		#	return text.translate(maketrans(self.arabic_numbers, self.persian_numbers))
@@ -376,7 +496,7 @@ class PersianTextNormalizer():
 			>>> fix_misc_non_persian_chars('علي')
 			'علی'
 		"""
-		return text.translate(str.maketrans(self.bad_chars, self.good_chars))
+		return text.translate(self._misc_non_persian_chars_table)
 
 	def fix_perfix_spacing(self, text):
 		"""
@@ -424,14 +544,20 @@ class PersianTextNormalizer():
 		"""
 			remove spaces, tabs, and new lines from the beginning and enf of file
 		"""
+		if (self._sentinel):
+			text = self._sentinel_spaces.sub(self._sentinel, text)
 		return text.strip()
 
 	def fix_suffix(self, text):
+		if (self._single_pass_affixes):
+			return self._fix_suffix_rewriter.sub(text)
 		for pattern, rep in self._fix_suffix_pattern:
 			text = pattern.sub(rep, text)
 		return text
 
 	def fix_prefix(self, text):
+		if (self._single_pass_affixes):
+			return self._fix_prefix_rewriter.sub(text)
 		for pattern in self._fix_prefix_pattern:
 			text = pattern.sub(r'‌ \1‌', text)
 		return text
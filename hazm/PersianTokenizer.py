@@ -1,4 +1,5 @@
-import re
+import re, collections, functools
+from hazm.BatchCoalescer import *
 
 class PersianTokenizer():
 	# The PersianTokenizer class contains a python version of the original perl implementation of 
@@ -39,6 +40,12 @@ class PersianTokenizer():
 				r' '
 			)
 		]
+		self._coalescer = None
+
+		# a word is runs of letters joined by single zwnj or single punctuation marks (e.g. 3.5),
+		# other punctuation runs are tokens of their own
+		letters = r'[^' + punc + r'\s\u200c]+(?:\u200c[^' + punc + r'\s\u200c]+)*'
+		self._span_pattern = re.compile(letters + '(?:[' + punc + ']' + letters + ')*|[' + punc + ']+')
 
 	def sent_tokenize(self, text):
 		text = text.replace("\n", " ")
@@ -50,8 +57,80 @@ class PersianTokenizer():
 			text = pattern.sub(rep, text)
 		return text.split(' ')
 
+	def async_executor(self, executor=None, batch_size=64, delay=0.002):
+		"""
+			Sets how aword_tokenize_stream runs, e.g. a ProcessPoolExecutor to use more cores (DEFAULT: one thread)
+		"""
+		self._coalescer = BatchCoalescer(functools.partial(map_method, self, 'word_tokenize'), executor, batch_size, delay)
+
+	async def aword_tokenize_stream(self, texts, window=64):
+		"""
+			Yields list of words of each sentence of texts (e.g. sent_tokenize output), an iterable or
+			async iterable, in order. Up to window sentences are tokenized ahead, together with
+			sentences of other concurrent streams.
+
+			>>> async for words in tokenizer.aword_tokenize_stream(sentences):
+		"""
+		if self._coalescer is None:
+			with coalescer_lock:
+				if self._coalescer is None:
+					self.async_executor()
+
+		async def items():
+			if hasattr(texts, '__aiter__'):
+				async for text in texts:
+					yield text
+			else:
+				for text in texts:
+					yield text
+
+		import asyncio
+		pending = collections.deque()
+		async for text in items():
+			pending.append(asyncio.ensure_future(self._coalescer.submit(text)))
+			if len(pending) >= window:
+				yield await pending.popleft()
+		while pending:
+			yield await pending.popleft()
+
+	def __getstate__(self):
+		# the coalescer holds its executor, process executors get the rules only
+		state = self.__dict__.copy()
+		state['_coalescer'] = None
+		return state
+
+	def sent_span_tokenize(self, text):
+		"""
+			Yields (start, end) of sentences in text, text[start:end] is the sentence sent_tokenize
+			returns (with newlines not replaced), empty sentences are skipped
+
+			>>> list(PersianTokenizer().sent_span_tokenize('به مدرسه رفتم. کتاب خواندم.'))
+			[(0, 14), (15, 27)]
+		"""
+		start = 0
+		for match in self._sentence_pattern.finditer(text):
+			yield start, match.end(1)
+			start = match.end()
+		if start < len(text):
+			yield start, len(text)
+
+	def span_tokenize(self, text):
+		"""
+			Yields (start, end) of words in text in one scan, text[start:end] is mostly the token
+			word_tokenize returns, without empty tokens and zwnj at edges of tokens. Unlike word_tokenize
+			a punctuation mark is always split from the word after it, e.g. '«این' in 'گفت: «این'
+
+			>>> list(PersianTokenizer().span_tokenize('«سلام»، سه و 3.5.'))
+			[(0, 1), (1, 5), (5, 7), (8, 10), (11, 12), (13, 16), (16, 17)]
+		"""
+		for match in self._span_pattern.finditer(text):
+			yield match.span()
+
 if __name__ == '__main__':
 	tokenizer = PersianTokenizer()
 	text = "واحد رسانه هاي خارجي همشهري: دولت ژاپن بودجه سال آينده كشور را تصويب كرد. بودجه 680 ميليارد دلاري ژاپن نشان دهنده 3 درصد افزايش  نسبت به امسال است. تحليلگران تدوين اين بودجه را تلاش محتاطانه دولت  براي تقويت بهبود اقتصادي خواندند.  به گزارش تلويزيون سي ان ان، از اوائل سال آينده ماليات بر مصرف در ژاپن از 3 درصدبه 5 درصد افزايش مي يابد برخي كارشناسان انجام  اين تغيير را داراي اثرات زياد بر اقتصاد ارزيابي مي كنند. برخي  كارشناسان رشد اقتصادي سال آينده ژاپن را بين 5/0 تا 5/2 درصد پيش بيني مي كنند و دولت رقم 9/1 درصد را برآورد مي كند.  ابهام در مورد رشد اقتصادي سال آينده كشورتا حدي بر بازار سهام  ژاپن اثر منفي گذاشت در پايان هفته 3 درصد از ارزش شاخص بورس توكيو نسبت به اول هفته كاهش يافت. من شمردم یک دو سه و ... تا به صد رسیدم. من غذا می خورم. تو غذا نمی‌خورم."
 	for sent in tokenizer.sent_tokenize(text):
-		tokenizer.word_tokenize(sent)
\ No newline at end of file
+		tokenizer.word_tokenize(sent)
+
+	for start, end in tokenizer.sent_span_tokenize(text):
+		[text[s:e] for s, e in tokenizer.span_tokenize(text[start:end])]
\ No newline at end of file
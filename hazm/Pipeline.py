@@ -0,0 +1,73 @@
+from hazm.PersianTextNormalizer import *
+from hazm.PersianTokenizer import *
+
+class Pipeline():
+	"""
+		Normalizes, splits and tokenizes text in one call, with the output of cleanup, sent_tokenize
+		and word_tokenize. Suffix and prefix rules of the normalizer run as one SinglePassRewriter
+		scan and sentences are found by offsets in the normalized text, without splitting it again.
+
+		With spans=True words are found by one span_tokenize scan too, which is faster but does
+		not reproduce every word_tokenize quirk: word_tokenize does not split a punctuation mark
+		from the word after it when the mark follows another punctuation mark and a space, e.g.
+		'گفت: «این' gives '«این', while span_tokenize gives '«' and 'این'.
+
+		>>> Pipeline().tokenize('من به مدرسه رفتم. کتاب خواندم.')
+		[['من', 'به', 'مدرسه', 'رفتم', '.'], ['کتاب', 'خواندم', '.']]
+	"""
+
+	def __init__(self, normalizer=None, tokenizer=None, spans=False):
+		"""
+			:param normalizer (optionally): PersianTextNormalizer, None for no normalization (DEFAULT: PersianTextNormalizer(single_pass_affixes=True))
+			:param tokenizer  (optionally): PersianTokenizer (DEFAULT: PersianTokenizer())
+			:param spans      (optionally): find words with span_tokenize instead of word_tokenize (DEFAULT: False)
+		"""
+		self.normalizer = PersianTextNormalizer(single_pass_affixes=True) if normalizer is None else normalizer
+		self.tokenizer = PersianTokenizer() if tokenizer is None else tokenizer
+		self.spans = spans
+
+	def sents(self, text):
+		"""
+			Yields list of words of each sentence
+		"""
+		if self.normalizer:
+			text = self.normalizer.cleanup(text)
+		# as sent_tokenize does, offsets do not change
+		text = text.replace('\n', ' ')
+		if self.spans:
+			words = self.tokenizer._span_pattern.finditer
+			sents = ([match.group() for match in words(text, start, end)] for start, end in self.tokenizer.sent_span_tokenize(text))
+		else:
+			word_tokenize = self.tokenizer.word_tokenize
+			sents = ([word for word in word_tokenize(text[start:end]) if word] for start, end in self.tokenizer.sent_span_tokenize(text))
+		for sent in sents:
+			if sent:
+				yield sent
+
+	def tokenize(self, text):
+		return list(self.sents(text))
+
+if __name__ == '__main__':
+	# output and speed against the normalize, sent_tokenize, word_tokenize chain on Hamshahri files
+	from hazm.HamshahriReader import *
+	import sys, time
+
+	reader = HamshahriReader(sys.argv[1] if len(sys.argv) > 1 else 'data/hamshahri/')
+	texts = [text for fid in reader.fileids()[:20] for text in reader.texts(fids=fid, normalize=False)]
+	normalizer, tokenizer = PersianTextNormalizer(), PersianTokenizer()
+
+	start = time.time()
+	chain = [[[word for word in tokenizer.word_tokenize(sent) if word] for sent in tokenizer.sent_tokenize(normalizer.cleanup(text))] for text in texts]
+	chain = [[sent for sent in sents if sent] for sents in chain]
+	chain_time = time.time() - start
+
+	sents = sum(len(doc) for doc in chain)
+	print('documents:  %d, sentences: %d' % (len(texts), sents))
+	print('chain:      %.2f s' % chain_time)
+
+	for name, pipeline in (('pipeline', Pipeline()), ('spans', Pipeline(spans=True))):
+		start = time.time()
+		fused = [pipeline.tokenize(text) for text in texts]
+		fused_time = time.time() - start
+		same = sum(1 for a, b in zip(chain, fused) for x, y in zip(a, b) if x == y)
+		print('%-10s  %.2f s, %.2f%% of sentences identical, %d documents differ' % (name + ':', fused_time, 100.0 * same / max(sents, 1), sum(1 for a, b in zip(chain, fused) if a != b)))
@@ -0,0 +1,118 @@
+# coding=utf8
+
+from nltk.stem.api import StemmerI
+from functools import lru_cache
+from hazm.LexiconStore import *
+
+class SuffixStemmer(StemmerI):
+	"""
+		A rule based stemmer that strips Persian inflectional suffixes in process.
+		Suffixes are kept in a trie of reversed strings, so the longest suffix is found
+		in one backward walk over the token, and stems are memoized in a bounded LRU cache.
+
+		>>> SuffixStemmer().stem('کتاب‌هایشان')
+		'کتاب'
+		>>> SuffixStemmer().stem('بزرگترین')
+		'بزرگ'
+		>>> SuffixStemmer().stem_many(['درختان', 'دانشجویان', 'خانه‌ام', 'سازمان', 'اسلام', 'کبوتر', 'بهترین'])
+		['درخت', 'دانشجو', 'خانه', 'سازمان', 'اسلام', 'کبوتر', 'بهترین']
+		>>> LexiconStore.build('data/stem-exceptions.lex', [('ستاره', ''), ('مردان', 'مرد'), ('دوستان', 'دوست')])
+		>>> SuffixStemmer(exceptions='data/stem-exceptions.lex').stem_many(['مردان', 'دوستان'])
+		['مرد', 'دوست']
+	"""
+
+	# (suffix, minimum length of the remaining stem, stem endings that block the suffix, stem endings the suffix needs),
+	# limits apply to attached suffixes, a suffix after zwnj only needs min_detached_stem letters before it.
+	# Stems the rules get wrong (دوستان, مردمان) belong in exceptions.
+	suffixes = [
+		('ها', 2, ()), ('های', 2, ()), ('هایی', 2, ()), ('هایم', 2, ()), ('هایت', 2, ()), ('هایش', 2, ()), ('هایمان', 2, ()), ('هایتان', 2, ()), ('هایشان', 2, ()),
+		('ترین', 3, ()), ('تر', 4, ()),
+		('ان', 4, ('ست', 'م')), ('یان', 3, (), ('ا', 'و')), ('ات', 3, ()),
+		('ام', 5, ()), ('اش', 5, ()), ('ایم', 3, ()), ('اید', 3, ()), ('اند', 3, ()),
+		('مان', 5, ()), ('تان', 4, ('س',)), ('شان', 3, ()),
+	]
+	min_detached_stem = 2
+
+	def __init__(self, cache_size=65536, exceptions=None):
+		"""
+			:param cache_size (optionally): number of memoized tokens, None for unbounded (DEFAULT: 65536)
+			:param exceptions (optionally): LexiconStore (or its file) or dict of words and their stems, an empty stem keeps the word (DEFAULT: None)
+		"""
+		if isinstance(exceptions, str):
+			exceptions = LexiconStore(exceptions)
+		self._exceptions = exceptions
+
+		self._trie = {}
+		for entry in self.suffixes:
+			suffix, min_stem, blocked, needed = (entry + ((),))[:4]
+			node = self._trie
+			for char in reversed(suffix):
+				node = node.setdefault(char, {})
+			node[None] = (min_stem, blocked, needed)
+
+		self._cached_stem = lru_cache(maxsize=cache_size)(self._stem)
+
+	def stem(self, token):
+		return self._cached_stem(token)
+
+	def _stem(self, token):
+		if self._exceptions is not None:
+			stem = self._exceptions.get(token)
+			if stem is not None:
+				return stem or token
+
+		# walk the trie backward from the last character and keep the longest suffix
+		# that leaves a long enough stem
+		node = self._trie
+		cut = i = len(token)
+		while i > 0:
+			node = node.get(token[i-1])
+			if node is None:
+				break
+			i -= 1
+			if None in node:
+				stem = token[:i].rstrip('‌')
+				min_stem, blocked, needed = node[None]
+				if token[i-1:i] == '‌':
+					if len(stem) >= self.min_detached_stem:
+						cut = i
+				elif len(stem) >= min_stem and not stem.endswith(blocked) and (not needed or stem.endswith(needed)):
+					cut = i
+		return token[:cut].rstrip('‌')
+
+	def stem_many(self, tokens):
+		return [self.stem(token) for token in tokens]
+
+if __name__ == '__main__':
+	# agreement with perstem.pl and throughput on Bijankhan words, or words of a text file
+	from hazm.PerStemmer import PerStemmer
+	from hazm import BijankhanReader
+	import collections, sys, time
+
+	if len(sys.argv) > 1:
+		from hazm.Pipeline import Pipeline
+		words = [word for sent in Pipeline().sents(open(sys.argv[1], encoding='utf-8').read()) for word in sent]
+	else:
+		words = [word for sent in BijankhanReader.sents() for word in sent.split(' ')]
+	native = SuffixStemmer()
+	perstem = PerStemmer(pool_size=4)
+
+	start = time.time()
+	native_stems = SuffixStemmer(cache_size=0).stem_many(words)
+	uncached = time.time() - start
+	start = time.time()
+	native_stems = native.stem_many(words)
+	cached = time.time() - start
+	start = time.time()
+	perstem_stems = perstem.stem_many(words)
+	perl = time.time() - start
+	perstem.close()
+
+	agreement = sum(1 for a, b in zip(native_stems, perstem_stems) if a == b)
+	print('words:             %d' % len(words))
+	print('agreement:         %.2f%%' % (100.0 * agreement / len(words)))
+	for (word, native_stem, perstem_stem), count in collections.Counter((word, a, b) for word, a, b in zip(words, native_stems, perstem_stems) if a != b).most_common(20):
+		print('  %d\t%s\t%s\t%s' % (count, word, native_stem, perstem_stem))
+	print('native (no cache): %d tokens/s' % (len(words) / uncached))
+	print('native (cached):   %d tokens/s' % (len(words) / cached))
+	print('perstem:           %d tokens/s' % (len(words) / perl))
@@ -0,0 +1,136 @@
+from __future__ import print_function
+import subprocess, threading, time, sys
+
+class TrainingJob():
+	"""
+		Handle of a training command running in background. Its output is always drained, so
+		the process can not block on a full pipe, and kept in log as it arrives.
+
+		>>> job = TrainingJob([sys.executable, '-c', 'print(1)'])
+		>>> list(job.lines())
+		['1']
+		>>> job.wait()
+		0
+	"""
+
+	def __init__(self, cmd, verbose=False, limiter=None):
+		"""
+			:param cmd: command to run
+			:param verbose (optionally): print output lines as they arrive (DEFAULT: False)
+			:param limiter (optionally): semaphore shared by jobs that may not all run at the same time (DEFAULT: None)
+		"""
+		self.cmd = cmd
+		self.verbose = verbose
+		self.log = []
+		self.returncode = None
+		self.peak_rss = None
+		self._limiter = limiter
+		self._process = None
+		self._started = None
+		self._finished = None
+		self._killed = False
+		self._changed = threading.Condition()
+		self._thread = threading.Thread(target=self._run)
+		self._thread.daemon = True
+		self._thread.start()
+
+	def _run(self):
+		if self._limiter is not None:
+			self._limiter.acquire()
+		try:
+			with self._changed:
+				if self._killed:
+					self.returncode = -9
+					return
+				self._started = time.time()
+				self._process = subprocess.Popen(self.cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+
+			monitor = threading.Thread(target=self._monitor)
+			monitor.daemon = True
+			monitor.start()
+
+			for line in self._process.stdout:
+				line = line.rstrip('\n')
+				if self.verbose:
+					print(line, file=sys.stderr)
+				with self._changed:
+					self.log.append(line)
+					self._changed.notify_all()
+
+			returncode = self._process.wait()
+			with self._changed:
+				self.returncode = returncode
+		except OSError as error:
+			with self._changed:
+				self.log.append(str(error))
+				self.returncode = -1
+		finally:
+			with self._changed:
+				self._finished = time.time()
+				self._changed.notify_all()
+			if self._limiter is not None:
+				self._limiter.release()
+
+	def _monitor(self):
+		# peak resident memory of the process, from /proc where it is available
+		while self._process.poll() is None:
+			try:
+				with open('/proc/%d/status' % self._process.pid) as status:
+					for line in status:
+						if line.startswith('VmHWM:'):
+							self.peak_rss = int(line.split()[1]) * 1024
+			except (IOError, ValueError):
+				return
+			time.sleep(0.5)
+
+	def poll(self):
+		"""
+			Returns exit code, or None while the job is pending or running
+		"""
+		return self.returncode if self._finished else None
+
+	def wait(self, timeout=None):
+		"""
+			Waits for the job to finish and returns its exit code (None on timeout)
+		"""
+		self._thread.join(timeout)
+		return self.poll()
+
+	def lines(self):
+		"""
+			Yields output lines, including the ones printed before the call, until the job finishes
+		"""
+		i = 0
+		while True:
+			with self._changed:
+				while i >= len(self.log) and not self._finished:
+					self._changed.wait()
+				if i >= len(self.log):
+					return
+				line = self.log[i]
+			i += 1
+			yield line
+
+	def kill(self):
+		with self._changed:
+			self._killed = True
+			if self._process is not None and self._process.poll() is None:
+				self._process.kill()
+
+	@property
+	def state(self):
+		if self._finished:
+			return 'finished'
+		return 'running' if self._started else 'pending'
+
+	@property
+	def elapsed(self):
+		"""
+			Seconds since the process started, up to its end
+		"""
+		if not self._started:
+			return 0.0
+		return (self._finished or time.time()) - self._started
+
+	def stats(self):
+		return {'state': self.state, 'returncode': self.returncode, 'elapsed': self.elapsed, 'peak_rss': self.peak_rss, 'lines': len(self.log)}
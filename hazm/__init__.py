@@ -0,0 +1,36 @@
+"""
+	Top level api of hazm. Each name is imported from its module on first use, so
+	`import hazm` does not load nltk, numpy, lxml or java and .net backends.
+
+	>>> import hazm
+	>>> hazm.Normalizer().cleanup('اصلاح نويسه ها')
+	'اصلاح نویسه ها'
+"""
+
+_lazy = {
+	'Normalizer': ('hazm.PersianTextNormalizer', 'PersianTextNormalizer'),
+	'Tokenizer': ('hazm.PersianTokenizer', 'PersianTokenizer'),
+	'Pipeline': ('hazm.Pipeline', 'Pipeline'),
+	'Stemmer': ('hazm.PerStemmer', 'PerStemmer'),
+	'SuffixStemmer': ('hazm.SuffixStemmer', 'SuffixStemmer'),
+	'POSTagger': ('hazm.PersianPOSTagger', 'PersianPOSTagger'),
+	'PerceptronTagger': ('hazm.PerceptronPOSTagger', 'PerceptronPOSTagger'),
+	'DependencyParser': ('hazm.PersianDependencyParser', 'PersianDependencyParser'),
+	'Lemmatizer': ('hazm.PersianLemmatizer', 'PersianLemmatizer'),
+	'HamshahriCorpus': ('hazm.HamshahriReader', 'HamshahriReader'),
+}
+
+__all__ = sorted(_lazy)
+
+def __getattr__(name):
+	if name not in _lazy:
+		raise AttributeError("module 'hazm' has no attribute '%s'" % name)
+	import importlib
+	module, attribute = _lazy[name]
+	value = getattr(importlib.import_module(module), attribute)
+	globals()[name] = value
+	return value
+
+def __dir__():
+	# public names only, not submodules that imports have set on the package
+	return list(__all__)
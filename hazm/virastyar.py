@@ -1,12 +1,20 @@
 #-*- coding: utf-8 -*-
-import clr
-clr.AddReference("./Virastyar.NLP.Morphology.Inflection.dll")
-clr.AddReference("./Virastyar.PersianTools.dll")
-clr.AddReference("./Virastyar.Utility.dll")
-from Virastyar.NLP.Morphology.Inflection import PersianLemmatizer
-from Virastyar.NLP.Morphology.Inflection import WordFormationInfo
-import Virastyar.NLP.Morphology.Inflection.PhoneticComparison as PhoneticComparison
-import Virastyar.NLP.Morphology.Inflection.StringMatching as StringMatching
+
+# Virastyar DLLs are loaded on first use, so the module can be imported without IronPython
+PersianLemmatizer = WordFormationInfo = PhoneticComparison = StringMatching = None
+
+def load_virastyar():
+	global PersianLemmatizer, WordFormationInfo, PhoneticComparison, StringMatching
+	if PersianLemmatizer is not None:
+		return
+	import clr
+	clr.AddReference("./Virastyar.NLP.Morphology.Inflection.dll")
+	clr.AddReference("./Virastyar.PersianTools.dll")
+	clr.AddReference("./Virastyar.Utility.dll")
+	from Virastyar.NLP.Morphology.Inflection import PersianLemmatizer
+	from Virastyar.NLP.Morphology.Inflection import WordFormationInfo
+	import Virastyar.NLP.Morphology.Inflection.PhoneticComparison as PhoneticComparison
+	import Virastyar.NLP.Morphology.Inflection.StringMatching as StringMatching
 
 class VirastyarPersianLemmatizer():
 	""" 
@@ -39,6 +47,7 @@ class VirastyarPersianLemmatizer():
 	"""
 
 	def __init__(self, string_matching=True, phonetic_comparison=True, ignore_lexicalLemma=False, ignore_declentionRules=True):
+		load_virastyar()
 		if string_matching == True:
 			self.StringMatchingStatus = StringMatching.IgnorePseudoSpace
 		else:
@@ -68,6 +77,7 @@ class VirastyarWordTokenizer():
 
 	"""
 	def __init__(self):
+		load_virastyar()
 		self.wordtokenizer = WordTokenizer(0)
 
 	def tokenize(self , line):
@@ -2,6 +2,6 @@ from distutils.core import setup
 setup(
 	name = 'hazm',
 	packages = ['hazm'],
-	package_data	= {'hazm': ['perstem.pl']},
+	package_data	= {'hazm': ['perstem.pl', 'MaltServer.java']},
 	version = '0.1'
 )
\ No newline at end of file